@@ -1,8 +1,24 @@
 import streamlit as st
+import json
 import os
 import time
+import uuid
+import streamlit.components.v1 as components
 from dotenv import load_dotenv
-from utils.scraper import scrape_blog_post
+import config
+from utils.cache import get_response_cache, make_key
+from utils.clients import get_client
+from utils.compress import compress
+from utils.context import build_context
+from utils.drafts import get_draft_store
+from utils.fanout import stream_sections
+from utils.formats import FORMAT_HEADINGS, RESPONSE_HEADER, compose_response, section_prompt_version
+from utils.prefetch import find_url, get_prefetcher
+from utils.ratelimit import INTERACTIVE, stream_with_retry
+from utils.scraper import scrape_article
+from utils.streaming import StreamRenderer
+from utils.transcript import Transcript
+from utils.usage import add_usage, format_usage, usage_dict
 
 # Load environment variables from .env file (for local development)
 load_dotenv()
@@ -84,15 +100,28 @@ CONTENT_TYPES = {
 }
 
 # --- SESSION STATE ---
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-if "draft_history" not in st.session_state:
-    st.session_state.draft_history = []
+if "transcript" not in st.session_state:
+    st.session_state.transcript = Transcript()
 
 if "current_page" not in st.session_state:
     st.session_state.current_page = "finn"
 
+# Drafts are private to the browser that made them, via a random id kept in
+# a long-lived cookie. Streamlit can only read cookies, so a new id is set
+# from a zero-height component.
+if "owner_id" not in st.session_state:
+    cookie = st.context.cookies.get(config.OWNER_COOKIE) or ""
+    if len(cookie) == 32 and all(c in "0123456789abcdef" for c in cookie):
+        st.session_state.owner_id = cookie
+    else:
+        st.session_state.owner_id = uuid.uuid4().hex
+        components.html(
+            "<script>window.parent.document.cookie = "
+            f"'{config.OWNER_COOKIE}={st.session_state.owner_id}; max-age={config.OWNER_COOKIE_MAX_AGE}; "
+            "path=/; SameSite=Lax' + (window.parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+            height=0
+        )
+
 # --- HANDLE LOGO CLICK (home navigation via query param) ---
 query_params = st.query_params
 if query_params.get("home") == "true":
@@ -117,7 +146,8 @@ with st.sidebar:
     # Simple vertical navigation
     if st.button("⚡ Content Fin", use_container_width=True):
         st.session_state.current_page = "finn"
-        st.session_state.messages = []  # Reset chat
+        st.session_state.transcript.clear()  # Reset chat
+        st.session_state.transcript_earlier = 0
         st.rerun()
     if st.button("🕒 Draft History", use_container_width=True):
         st.session_state.current_page = "history"
@@ -156,6 +186,9 @@ with st.sidebar:
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if api_key:
         st.success("🟢 Connected to Anthropic")
+        st.toggle("♻️ Regenerate (skip cache)", key="skip_cache")
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} saved")
     else:
         st.warning("🟡 Demo Mode")
 
@@ -565,21 +598,77 @@ elif st.session_state.current_page == "history":
     st.title("🕒 Draft History")
     st.markdown("---")
     
-    if not st.session_state.draft_history:
-        st.info("No drafts yet. Go to Content Fin and paste some content to generate drafts.")
+    from datetime import datetime
+    draft_store = get_draft_store()
+    per_page = config.HISTORY_PAGE_SIZE
+    
+    query = st.text_input(
+        "Search drafts",
+        placeholder="🔍 Search previews and content...",
+        label_visibility="collapsed",
+        key="history_query"
+    )
+    # A new search starts from the first page
+    if query != st.session_state.get("history_last_query", ""):
+        st.session_state.history_page = 0
+        st.session_state.history_last_query = query
+    
+    # Only one page of previews is loaded; bodies are loaded when opened
+    page = st.session_state.get("history_page", 0)
+    drafts, total = draft_store.page(st.session_state.owner_id, page, per_page, query)
+    pages = max(1, -(-total // per_page))
+    if page >= pages:
+        page = st.session_state.history_page = pages - 1
+        drafts, total = draft_store.page(st.session_state.owner_id, page, per_page, query)
+    
+    if not total:
+        if query:
+            st.info("No drafts match that search.")
+        else:
+            st.info("No drafts yet. Go to Content Fin and paste some content to generate drafts.")
     else:
-        for i, draft in enumerate(reversed(st.session_state.draft_history)):
-            with st.expander(f"Draft {len(st.session_state.draft_history) - i}: {draft.get('preview', 'Untitled')[:50]}..."):
-                st.markdown(draft.get('content', ''))
-                st.caption(f"Generated: {draft.get('timestamp', 'Unknown')}")
-                
-                # Download button for each draft
-                st.download_button(
-                    "📥 Download as TXT",
-                    draft.get('content', ''),
-                    file_name=f"draft_{len(st.session_state.draft_history) - i}.txt",
-                    mime="text/plain"
-                )
+        open_id = st.session_state.get("history_open")
+        for i, draft in enumerate(drafts):
+            number = total - page * per_page - i
+            is_open = draft['id'] == open_id
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"**Draft {number}:** {(draft['preview'] or 'Untitled')[:80]}...")
+                caption = f"Generated: {datetime.fromtimestamp(draft['created_at']).strftime('%Y-%m-%d %H:%M')}"
+                if draft['source_url']:
+                    caption += f" · Source: {draft['source_url']}"
+                st.caption(caption)
+            with col2:
+                if st.button("Close" if is_open else "Open", key=f"history_toggle_{draft['id']}", use_container_width=True):
+                    st.session_state.history_open = None if is_open else draft['id']
+                    st.rerun()
+            
+            if is_open:
+                content = draft_store.get_content(st.session_state.owner_id, draft['id'])
+                with st.container(border=True):
+                    st.markdown(content)
+                    
+                    # Download button for the open draft
+                    st.download_button(
+                        "📥 Download as TXT",
+                        content,
+                        file_name=f"draft_{number}.txt",
+                        mime="text/plain",
+                        key=f"draft_dl_{draft['id']}"
+                    )
+        
+        st.markdown("---")
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            if st.button("← Newer", disabled=page == 0, use_container_width=True):
+                st.session_state.history_page = page - 1
+                st.rerun()
+        with col_info:
+            st.caption(f"Page {page + 1} of {pages} · {total} drafts")
+        with col_next:
+            if st.button("Older →", disabled=page >= pages - 1, use_container_width=True):
+                st.session_state.history_page = page + 1
+                st.rerun()
 
 else:  # Content Fin (default)
     # Handle example URL if triggered from sidebar
@@ -588,11 +677,12 @@ else:  # Content Fin (default)
         st.session_state.example_url = None  # Clear it
         
         with st.spinner("Fetching article..."):
-            scraped = scrape_blog_post(url)
+            article = scrape_article(url)
         
-        if scraped:
-            st.session_state.pending_content = scraped
-            st.session_state.pending_url = url
+        if article and article.text:
+            st.session_state.pending_content = article.body
+            st.session_state.pending_url = article.canonical_url or url
+            st.session_state.pending_title = article.title
     
     # Handle strategy prompts from sidebar
     if "strategy_prompt" in st.session_state and st.session_state.strategy_prompt:
@@ -766,22 +856,15 @@ This is where Content Fin accelerates the team—turning 1 piece into 10 in minu
         if strategy_type in STRATEGY_RESPONSES:
             response_data = STRATEGY_RESPONSES[strategy_type]
             # Add user message
-            st.session_state.messages.append({
-                "role": "user",
-                "content": response_data["user_msg"]
-            })
+            st.session_state.transcript.append("user", response_data["user_msg"])
             # Add strategic response
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response_data["response"]
-            })
+            st.session_state.transcript.append("assistant", response_data["response"])
     
     # Pre-populate with intro if empty
-    if not st.session_state.messages:
-        st.session_state.messages = [
-            {
-                "role": "assistant",
-                "content": """**Content Fin** (v0.5)
+    if not len(st.session_state.transcript):
+        st.session_state.transcript.append(
+            "assistant",
+            """**Content Fin** (v0.5)
 
 Hello. I am Content Fin. I am trained on the Intercom Style Guide.
 
@@ -797,14 +880,60 @@ Available formats:
 - 🔍 SEO Headlines & Meta
 
 """
-            }
-        ]
+        )
     
-    # Render chat
-    for idx, msg in enumerate(st.session_state.messages):
+    # Render chat: only the recent window, plus any earlier messages the
+    # user has asked for (loaded from the draft store)
+    transcript = st.session_state.transcript
+    earlier_count = min(st.session_state.get("transcript_earlier", 0), transcript.spilled)
+    if earlier_count < transcript.spilled:
+        if st.button(f"⬆️ Show earlier messages ({transcript.spilled - earlier_count} hidden)", key="show_earlier"):
+            st.session_state.transcript_earlier = earlier_count + config.TRANSCRIPT_WINDOW
+            st.rerun()
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    regenerate = st.session_state.pop("regenerate_section", None)
+    for msg in transcript.earlier(earlier_count) + transcript.messages:
         avatar = "🤖" if msg["role"] == "assistant" else "👤"
         with st.chat_message(msg["role"], avatar=avatar):
-            st.markdown(msg["content"])
+            if regenerate and regenerate["seq"] == msg["seq"] and msg.get("sections") is not None:
+                # Re-run just this format against the stored source text (its
+                # prompt prefix is likely still cached) and splice it back in
+                content_type = regenerate["content_type"]
+                st.markdown(RESPONSE_HEADER)
+                section_slots = {}
+                for t in msg["order"]:
+                    if t in msg["sections"] or t == content_type:
+                        st.markdown("---")
+                        section_slots[t] = st.empty()
+                        body = "⏳ Regenerating..." if t == content_type else msg["sections"][t].strip()
+                        section_slots[t].markdown(f"{FORMAT_HEADINGS[t]}\n\n{body}")
+                
+                renderer = None
+                regenerated = False
+                for kind, _, payload in stream_sections(get_client(api_key), msg["source_text"], [content_type]):
+                    if kind == "delta":
+                        if renderer is None:
+                            renderer = StreamRenderer(section_slots[content_type], max_fps=config.STREAM_MAX_FPS, measure=config.STREAM_MEASURE)
+                            renderer.push(f"{FORMAT_HEADINGS[content_type]}\n\n")
+                        renderer.push(payload)
+                    elif kind == "usage":
+                        print(f"[DEBUG] Regenerated {content_type}: {format_usage(payload)}")
+                    elif kind == "done":
+                        if renderer is not None:
+                            renderer.finish()
+                        msg["sections"][content_type] = payload
+                        msg["content"] = compose_response(msg["sections"], msg["order"])
+                        get_response_cache().set(msg["section_keys"][content_type], payload)
+                        if msg.get("draft_id"):
+                            get_draft_store().update_content(st.session_state.owner_id, msg["draft_id"], msg["content"])
+                        regenerated = True
+                    else:
+                        print(f"[ERROR] Regenerating {content_type} failed: {payload}")
+                        section_slots[content_type].error(f"❌ {CONTENT_TYPES[content_type]} failed: {payload}")
+                if regenerated:
+                    st.rerun()
+            else:
+                st.markdown(msg["content"])
             
             # Add share/download buttons for assistant responses (except intro)
             if msg["role"] == "assistant" and "I'll transform it into" not in msg["content"]:
@@ -815,22 +944,36 @@ Available formats:
                         msg["content"],
                         file_name="content_finn_output.txt",
                         mime="text/plain",
-                        key=f"dl_{idx}"
+                        key=f"dl_{msg['seq']}"
                     )
                 with col2:
-                    if st.button("📋 Copy", key=f"cp_{idx}"):
+                    if st.button("📋 Copy", key=f"cp_{msg['seq']}"):
                         st.toast("Content copied! Use Ctrl+C after selecting.")
+                
+                # Per-format regenerate (only for messages still in the window,
+                # since those are the ones that can be updated in place)
+                if api_key and msg.get("sections") is not None and msg["seq"] >= transcript.spilled:
+                    with col3:
+                        with st.popover("🔄 Regenerate a section"):
+                            for content_type in msg["order"]:
+                                if st.button(CONTENT_TYPES[content_type], key=f"regen_{msg['seq']}_{content_type}", use_container_width=True):
+                                    st.session_state.regenerate_section = {"seq": msg["seq"], "content_type": content_type}
+                                    st.rerun()
     
     # Check for pending content from example button
     pending_prompt = None
+    source_url = None  # Recorded with the draft when the input came from a URL
     if "pending_content" in st.session_state and st.session_state.pending_content:
         pending_prompt = st.session_state.pending_content
         pending_url = st.session_state.get("pending_url", "")
+        source_url = pending_url or None
+        pending_title = st.session_state.get("pending_title") or pending_url
         st.session_state.pending_content = None
         st.session_state.pending_url = None
+        st.session_state.pending_title = None
         
-        user_msg = f"📎 *Fetched from:* [{pending_url}]({pending_url})\n\n---\n\n{pending_prompt[:800]}..."
-        st.session_state.messages.append({"role": "user", "content": user_msg})
+        user_msg = f"📎 *Fetched from:* [{pending_title}]({pending_url})\n\n---\n\n{pending_prompt[:800]}..."
+        st.session_state.transcript.append("user", user_msg)
     
     # Custom input area (like Cursor's layout)
     st.markdown("---")
@@ -865,13 +1008,21 @@ Available formats:
     with col2:
         submit = st.button("➤ Send", use_container_width=True, type="primary")
     
+    # A bare URL in the input starts fetching in the background on this rerun
+    # (e.g. while formats are being picked), so Send doesn't wait on it
+    prefetch_url = find_url(user_input)
+    if prefetch_url and not submit:
+        warm_key = os.environ.get("ANTHROPIC_API_KEY") if config.PREFETCH_WARM_CACHE else None
+        selected_types = st.session_state.selected_types
+        get_prefetcher().prefetch(prefetch_url, api_key=warm_key, content_type=selected_types[0] if selected_types else None)
+    
     # Handle submission
     chat_input = user_input if submit and user_input else None
     prompt = pending_prompt or chat_input
     
     # DEBUG: Show in UI at the bottom
-    msg_count = len(st.session_state.get('messages', []))
-    msg_roles = [m.get('role') for m in st.session_state.get('messages', [])]
+    msg_count = len(st.session_state.transcript)
+    msg_roles = [m.get('role') for m in st.session_state.transcript.messages]
     reached = st.session_state.get('debug_reached_assistant', False)
     st.caption(f"🔧 Debug: submit={submit}, msgs={msg_count}, roles={msg_roles}, reached_asst={reached}")
     
@@ -887,25 +1038,29 @@ Available formats:
         # Only do URL detection if this came from chat input (not from pending example)
         if not pending_prompt and prompt.strip().startswith("http"):
             with st.spinner(f"Fetching article..."):
-                scraped = scrape_blog_post(prompt.strip())
-            if scraped:
-                user_msg = f"📎 *Fetched from:* [{prompt}]({prompt})\n\n---\n\n{scraped[:800]}..."
-                st.session_state.messages.append({"role": "user", "content": user_msg})
+                # Usually already fetched by the prefetcher; otherwise fetch now
+                article = get_prefetcher().article(prompt.strip()) or scrape_article(prompt.strip())
+            if article and article.text:
+                scraped = article.body
+                source_url = article.canonical_url or prompt.strip()
+                user_msg = f"📎 *Fetched from:* [{article.title or source_url}]({source_url})\n\n---\n\n{scraped[:800]}..."
+                st.session_state.transcript.append("user", user_msg)
                 prompt = scraped  # Use scraped content for generation
             else:
                 st.error("Couldn't fetch that URL. Try pasting the content directly.")
                 st.stop()
         elif not pending_prompt:
             # Regular text input from chat - check for duplicates first
-            if not st.session_state.messages or st.session_state.messages[-1].get("content") != prompt:
-                st.session_state.messages.append({"role": "user", "content": prompt})
+            last_msg = st.session_state.transcript.last()
+            if not last_msg or last_msg.get("content") != prompt:
+                st.session_state.transcript.append("user", prompt)
             else:
                 # Already added, skip (prevents duplicates on rerun)
                 pass
         # If pending_prompt, message was already added above
         
         with st.chat_message("user", avatar="👤"):
-            st.markdown(st.session_state.messages[-1]["content"])
+            st.markdown(st.session_state.transcript.last()["content"])
         
         # Store a debug flag in session state
         st.session_state.debug_reached_assistant = True
@@ -921,123 +1076,132 @@ Available formats:
             is_content_paste = len(prompt) > 300
             
             if api_key:
-                import anthropic
-                client = anthropic.Anthropic(api_key=api_key)
+                client = get_client(api_key)
                 
-                if is_content_paste:
-                    # Build dynamic system prompt based on selected content types
-                    content_instructions = {
-                        "linkedin": """**💼 LinkedIn Post**
-
-[Write a scroll-stopping LinkedIn post. Start with a contrarian hook. Short lines. End with a question. NO HASHTAGS.]""",
-                        "x_post": """**𝕏 Post**
-
-[Write a single punchy X post. Max 280 chars. Insight-heavy. NO HASHTAGS. NOT a thread.]""",
-                        "youtube": """**🎬 YouTube Script (2-3 min)**
-
-[Write a talking head script with [Visual Cues] in brackets. Conversational but professional tone.]""",
-                        "finn": """**🤖 Fin Answer (RAG)**
-
-[Write a factual, dense summary optimized for AI retrieval. No fluff.]""",
-                        "landing": """**🏠 Landing Page Copy**
-
-[Write landing page copy with:
-- Hero headline (bold, benefit-driven)
-- Subheadline (1-2 sentences expanding on the value)
-- 3 feature bullets (short, punchy)
-- CTA text (action-oriented button text)]""",
-                        "email": """**📧 Email Campaign**
-
-[Write a single marketing email with:
-- Subject line (curiosity-driving, under 50 chars)
-- Preview text (complementary, under 90 chars)
-- Body (conversational, 150-200 words, clear CTA)]""",
-                        "seo": """**🔍 SEO Headlines & Meta**
-
-[Write SEO assets:
-- Meta title (under 60 chars, keyword-rich)
-- Meta description (under 155 chars, compelling)
-- 2-3 H1 alternatives (varied angles)]"""
-                    }
-                    
-                    # Get selected types from session state
-                    selected_types = st.session_state.get("selected_types", ["linkedin", "x_post"])
-                    
-                    # Build the format section dynamically
-                    format_sections = []
-                    for content_type in selected_types:
-                        if content_type in content_instructions:
-                            format_sections.append(content_instructions[content_type])
-                    
-                    format_output = "\n\n---\n\n".join(format_sections)
-                    
-                    system_prompt = f"""You are Content Fin, Intercom's AI copywriter.
-
-The user has pasted content. Transform it into the requested assets using Intercom's voice (confident, simple, futurist, punchy).
-
-IMPORTANT RULES:
-- NO hashtags ever
-- Be direct and confident
-- Short sentences
-- No fluff or filler words
-
-Format your response EXACTLY like this:
-
-**Content Fin**
-
-Here are your drafts:
-
----
-
-{format_output}"""
-                else:
-                    system_prompt = """You are Content Fin, Intercom's AI copywriter.
-
-Intercom's Voice:
-- CONFIDENT: "We built X," not "We tried to build X."
-- SIMPLE: Short sentences. No jargon.
-- FUTURIST: Excited about AI.
-- PUNCHY: Sentence fragments.
-- NO HASHTAGS ever.
-
-Always start with "**Content Fin**" on its own line."""
-
                 try:
-                    placeholder.markdown("**Content Fin**\n\n⏳ Generating...")
-                    
                     # Debug: Show that we're attempting API call
                     print(f"[DEBUG] Calling Anthropic API with prompt: {prompt[:100]}...")
                     
-                    response = client.messages.create(
-                        model="claude-sonnet-4-5-20250929",
-                        max_tokens=2000,
-                        system=system_prompt,
-                        messages=[{"role": "user", "content": prompt}]
-                    )
+                    cache = get_response_cache()
+                    skip_cache = st.session_state.get("skip_cache")
+                    message_fields = {}
                     
+                    if is_content_paste:
+                        # Sections are cached per (article, format, prompt, model),
+                        # so only formats missing from the cache are generated
+                        selected_types = [t for t in st.session_state.get("selected_types", ["linkedin", "x_post"]) if t in FORMAT_HEADINGS]
+                        section_keys = {t: make_key(prompt, [t], section_prompt_version(t), config.CHAT_MODEL) for t in selected_types}
+                        sections = {}
+                        if not skip_cache:
+                            for content_type in selected_types:
+                                cached = cache.get(section_keys[content_type])
+                                if cached is not None:
+                                    sections[content_type] = cached
+                        missing_types = [t for t in selected_types if t not in sections]
+                        print(f"[DEBUG] Sections cached: {list(sections)}, generating: {missing_types}")
+                        
+                        placeholder.markdown(RESPONSE_HEADER)
+                        
+                        # Long sources are compressed to the input token budget
+                        source_text, compression = compress(prompt)
+                        if missing_types and compression["tokens_saved"]:
+                            print(f"[DEBUG] Input compressed: {compression}")
+                            st.caption(f"✂️ Source compressed: {compression['tokens_before']:,} → {compression['tokens_after']:,} tokens ({compression['tokens_saved']:,} saved per format)")
+                        
+                        section_slots = {}
+                        for content_type in selected_types:
+                            st.markdown("---")
+                            section_slots[content_type] = st.empty()
+                            if content_type in sections:
+                                section_slots[content_type].markdown(f"{FORMAT_HEADINGS[content_type]}\n\n{sections[content_type].strip()}")
+                            else:
+                                section_slots[content_type].markdown(f"{FORMAT_HEADINGS[content_type]}\n\n⏳ Generating...")
+                        
+                        # One concurrent request per missing format, each streamed
+                        # into its own section; they share the redraw budget
+                        section_fps = max(1, config.STREAM_MAX_FPS / max(1, len(missing_types)))
+                        renderers = {}
+                        errors = {}
+                        usage = {}
+                        for kind, content_type, payload in stream_sections(client, source_text, missing_types):
+                            if kind == "delta":
+                                if content_type not in renderers:
+                                    renderers[content_type] = StreamRenderer(section_slots[content_type], max_fps=section_fps, measure=config.STREAM_MEASURE)
+                                    renderers[content_type].push(f"{FORMAT_HEADINGS[content_type]}\n\n")
+                                renderers[content_type].push(payload)
+                            elif kind == "usage":
+                                add_usage(usage, payload)
+                            elif kind == "done":
+                                if content_type in renderers:
+                                    renderers[content_type].finish()
+                                sections[content_type] = payload
+                                cache.set(section_keys[content_type], payload)
+                            else:
+                                print(f"[ERROR] {content_type} generation failed: {payload}")
+                                errors[content_type] = payload
+                                section_slots[content_type].error(f"❌ {CONTENT_TYPES[content_type]} failed: {payload}")
+                        
+                        if usage:
+                            print(f"[DEBUG] Token usage: {usage}")
+                            st.caption(f"🧠 {format_usage(usage)}")
+                        if not sections and errors:
+                            raise next(iter(errors.values()))
+                        output = compose_response(sections, selected_types)
+                        
+                        # Follow-up turns refer to this article through a cached
+                        # system block instead of the pasted text
+                        st.session_state.transcript.source = source_text
+                        st.session_state.transcript.last()["source"] = True
+                        
+                        # Kept on the message so single sections can be regenerated
+                        message_fields = {
+                            "sections": sections,
+                            "order": selected_types,
+                            "source_text": source_text,
+                            "section_keys": section_keys,
+                        }
+                    else:
+                        # Follow-ups get bounded context: the source article and a
+                        # rolling summary in the system prompt, recent turns verbatim
+                        system, context_messages = build_context(client, st.session_state.transcript)
+                        
+                        # Identical requests (same context, prompt and model) are
+                        # answered from the response cache
+                        cache_key = make_key(json.dumps(context_messages), [], json.dumps(system), config.CHAT_MODEL)
+                        output = None if skip_cache else cache.get(cache_key)
+                        if output is not None:
+                            print(f"[DEBUG] Served from response cache")
+                            placeholder.markdown(output)
+                        else:
+                            # Stream deltas as they arrive; the renderer coalesces
+                            # redraws and only re-renders the block being written.
+                            renderer = StreamRenderer(placeholder, max_fps=config.STREAM_MAX_FPS, measure=config.STREAM_MEASURE)
+                            with stream_with_retry(
+                                client,
+                                INTERACTIVE,
+                                model=config.CHAT_MODEL,
+                                max_tokens=2000,
+                                system=system,
+                                messages=context_messages
+                            ) as stream:
+                                for delta in stream.text_stream:
+                                    renderer.push(delta)
+                                usage = usage_dict(stream.get_final_message().usage)
+                            output = renderer.finish()
+                            print(f"[DEBUG] Token usage: {usage}")
+                            st.caption(f"🧠 {format_usage(usage)}")
+                            cache.set(cache_key, output)
+
                     print(f"[DEBUG] Got response from API")
-                    output = response.content[0].text
-                    
-                    # Stream effect
-                    displayed = ""
-                    for char in output:
-                        displayed += char
-                        if len(displayed) % 3 == 0:
-                            placeholder.markdown(displayed + "▌")
-                            time.sleep(0.002)
-                    
-                    placeholder.markdown(output)
-                    st.session_state.messages.append({"role": "assistant", "content": output})
+                    assistant_msg = st.session_state.transcript.append("assistant", output, **message_fields)
                     success = True
                     
-                    # Save to draft history
+                    # Save to draft history (written in the background)
                     if is_content_paste:
-                        from datetime import datetime
-                        st.session_state.draft_history.append({
-                            "preview": prompt[:100],
-                            "content": output,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
-                        })
+                        assistant_msg["draft_id"] = get_draft_store().add(
+                            st.session_state.owner_id, output, preview=prompt[:100], source_url=source_url,
+                            formats=st.session_state.selected_types
+                        )
                     
                 except Exception as e:
                     import traceback
@@ -1188,25 +1352,18 @@ Not a chatbot. An AI agent that actually resolves issues.
 
 No training. No configuration. Just results."""
                 
-                # Stream demo
-                displayed = ""
-                for char in demo:
-                    displayed += char
-                    if len(displayed) % 3 == 0:
-                        placeholder.markdown(displayed + "▌")
-                        time.sleep(0.002)
-                
-                placeholder.markdown(demo)
-                st.session_state.messages.append({"role": "assistant", "content": demo})
+                # Stream demo in small chunks to mimic token deltas
+                renderer = StreamRenderer(placeholder, max_fps=config.STREAM_MAX_FPS, measure=config.STREAM_MEASURE)
+                for i in range(0, len(demo), 12):
+                    renderer.push(demo[i:i + 12])
+                    time.sleep(0.008)
+                renderer.finish()
+                st.session_state.transcript.append("assistant", demo)
                 success = True
                 
                 if is_content_paste:
-                    from datetime import datetime
-                    st.session_state.draft_history.append({
-                        "preview": prompt[:100],
-                        "content": demo,
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
-                    })
+                    get_draft_store().add(st.session_state.owner_id, demo, preview=prompt[:100],
+                                          source_url=source_url, formats=st.session_state.selected_types)
             
             # Clear input and rerun to show download buttons ONLY if successful
             if success:
@@ -0,0 +1,121 @@
+# =============================================================================
+# Scraper Benchmark
+# Compares HTML parser backends on a corpus of saved pages and checks that
+# every backend extracts the same text as html.parser. Also reports
+# extraction quality: extracted length per page and, for pages saved with a
+# reference `page.txt` (the hand-copied article body) next to `page.html`,
+# word-level precision and recall against that reference.
+#
+# Usage:
+#   python bench_scraper.py saved_pages/ [more.html ...] [--rounds 5]
+# =============================================================================
+
+import argparse
+import glob
+import os
+import time
+from collections import Counter
+
+from utils.scraper import extract_text
+
+BACKENDS = ["html.parser", "lxml"]
+
+
+def load_corpus(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.htm*"), recursive=True)))
+        else:
+            files.append(path)
+    corpus = []
+    for name in files:
+        with open(name, "rb") as f:
+            corpus.append((name, f.read()))
+    return corpus
+
+
+def word_overlap(extracted: str, reference: str):
+    """
+    Word-level precision (share of extracted words found in the reference)
+    and recall (share of reference words that were extracted).
+    """
+    got = Counter(extracted.lower().split())
+    want = Counter(reference.lower().split())
+    common = sum((got & want).values())
+    precision = common / max(1, sum(got.values()))
+    recall = common / max(1, sum(want.values()))
+    return precision, recall
+
+
+def report_quality(corpus, outputs):
+    print("\nExtraction quality")
+    scored = []
+    for name, html in corpus:
+        text = outputs[name]
+        line = f"  {os.path.basename(name):<40} {len(text):6d} chars"
+        reference_path = os.path.splitext(name)[0] + ".txt"
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                precision, recall = word_overlap(text, f.read())
+            scored.append((precision, recall))
+            line += f"  precision {precision:.2f}  recall {recall:.2f}"
+        print(line)
+
+    average = sum(len(text) for text in outputs.values()) / len(outputs)
+    print(f"  average length: {average:.0f} chars")
+    if scored:
+        print(
+            f"  mean precision {sum(p for p, _ in scored) / len(scored):.2f}  "
+            f"mean recall {sum(r for _, r in scored) / len(scored):.2f}  "
+            f"({len(scored)} pages with references)"
+        )
+
+
+def available(backend: str) -> bool:
+    try:
+        extract_text(b"<html><body><p>ok</p></body></html>", parser=backend)
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper parser backends")
+    parser.add_argument("paths", nargs="+", help="HTML files or directories of saved pages")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths)
+    if not corpus:
+        raise SystemExit("No HTML files found.")
+    total_mb = sum(len(html) for _, html in corpus) / 1e6
+    print(f"{len(corpus)} pages, {total_mb:.2f} MB, {args.rounds} rounds\n")
+
+    reference = {name: extract_text(html, parser="html.parser") for name, html in corpus}
+
+    for backend in BACKENDS:
+        if not available(backend):
+            print(f"{backend:<12} not installed")
+            continue
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            outputs = {name: extract_text(html, parser=backend) for name, html in corpus}
+        elapsed = time.perf_counter() - started
+
+        mismatches = [name for name in outputs if outputs[name] != reference[name]]
+        pages = len(corpus) * args.rounds
+        print(
+            f"{backend:<12} {pages / elapsed:8.1f} pages/s  "
+            f"{total_mb * args.rounds / elapsed:6.2f} MB/s  "
+            f"mismatches: {len(mismatches)}"
+        )
+        for name in mismatches:
+            print(f"    differs: {name}")
+
+    report_quality(corpus, reference)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,66 @@
 # by utils/generator.py for the batch/JSON generation mode (alternative API).
 # =============================================================================
 
+import os
+
 # Branding Configuration
 BRAND_NAME = "Content Fin"
 BRAND_PRIMARY_COLOR = "#0057ff"  # Intercom Blue
 BRAND_TEXT_COLOR = "#FFFFFF" 
 BRAND_BG_COLOR = "#111214"
 
+# Generation
+CHAT_MODEL = "claude-sonnet-4-5-20250929"
+SECTION_MAX_TOKENS = 1000  # Per-format budget when formats are generated in parallel
+FANOUT_MAX_WORKERS = int(os.environ.get("FANOUT_MAX_WORKERS", "4"))  # Concurrent format requests
+PROMPT_CACHE_MIN_TOKENS = 1024  # Shortest prefix the API will cache for Sonnet
+PROMPT_CACHE_WARMUP = os.environ.get("PROMPT_CACHE_WARMUP", "1") == "1"  # Start other formats once the first has written the cache (cacheable sources only)
+PROMPT_CACHE_WARMUP_TIMEOUT = float(os.environ.get("PROMPT_CACHE_WARMUP_TIMEOUT", "2"))  # Seconds to wait for the first response before going anyway
+SUMMARY_MODEL = "claude-haiku-4-5-20251001"  # Small model for rolling conversation summaries
+SUMMARY_MAX_TOKENS = 400
+CONTEXT_RECENT_MESSAGES = 6  # Chat messages sent verbatim with each follow-up
+CONTEXT_SUMMARY_BATCH = 4  # Older messages folded into the summary at a time
+CONTEXT_MESSAGE_MAX_CHARS = 4000  # Per-message cap in the context
+ASYNC_MAX_CONCURRENCY = int(os.environ.get("ASYNC_MAX_CONCURRENCY", "32"))  # In-flight agenerate_campaign calls
+INPUT_TOKEN_BUDGET = int(os.environ.get("INPUT_TOKEN_BUDGET", "3000"))  # Source text is compressed above this
+STRUCTURED_MAX_REPAIRS = 2  # Re-asks per invalid field in generate_campaign_structured
+
+# Rate limiting. These are client-side starting values (the API's lowest
+# tier): until the first response's anthropic-ratelimit-* headers replace
+# them, this process sends at most RATE_LIMIT_RPM requests a minute, so a
+# burst right after startup can queue even on a higher-tier key. Set them
+# to your key's limits to skip that.
+RATE_LIMIT_RPM = int(os.environ.get("RATE_LIMIT_RPM", "50"))  # Requests per minute
+RATE_LIMIT_ITPM = int(os.environ.get("RATE_LIMIT_ITPM", "30000"))  # Input tokens per minute
+RETRY_MAX_ATTEMPTS = 5  # Including the first try
+RETRY_BASE_DELAY = 1.0  # Seconds; doubled per attempt, with full jitter
+RETRY_MAX_DELAY = 30.0
+
+# Caching
+CACHE_DIR = os.environ.get("CONTENT_FIN_CACHE_DIR", ".cache")
+RESPONSE_CACHE_MAX_ENTRIES = 500
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # Seconds; 0 disables expiry
+FETCH_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Total HTML kept on disk
+FETCH_CACHE_TTL = 3600  # Seconds a fetched page is served without revalidating
+
+# Prefetch (URLs pasted into the chat are fetched before Send is pressed)
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_ENTRIES = 32  # Prefetched URLs remembered at once
+PREFETCH_TTL = 300  # Seconds a prefetched article is used for
+PREFETCH_WARM_CACHE = os.environ.get("PREFETCH_WARM_CACHE") == "1"  # Also write the article to the prompt cache (costs a cache write per URL)
+
+# Drafts
+DRAFTS_DB_PATH = os.environ.get("CONTENT_FIN_DRAFTS_DB", os.path.join(CACHE_DIR, "drafts.sqlite3"))
+HISTORY_PAGE_SIZE = 20  # Drafts per History page
+OWNER_COOKIE = "content_fin_owner"  # Per-browser id that drafts are stored under
+OWNER_COOKIE_MAX_AGE = 365 * 24 * 3600  # Seconds; drafts stay visible to the browser this long
+TRANSCRIPT_WINDOW = 12  # Chat messages kept in memory and rendered; older ones load on demand
+TRANSCRIPT_MAX_AGE_DAYS = float(os.environ.get("TRANSCRIPT_MAX_AGE_DAYS", "7"))  # Spilled chats untouched this long are deleted
+
+# Streaming
+STREAM_MAX_FPS = 12  # Max Markdown redraws per second while streaming
+STREAM_MEASURE = os.environ.get("STREAM_MEASURE") == "1"  # Log redraws/bytes per response
+
 # Prompts
 SYSTEM_PROMPT = """
 You are an elite Content Strategist at Intercom. You do not write "generic" marketing copy. You write provocative, insight-led content that challenges the status quo.
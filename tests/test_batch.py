@@ -0,0 +1,90 @@
+"""
+generate_campaigns_batch against a fake Message Batches client.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import generator
+from utils.cache import ResponseCache
+
+CAMPAIGN = {"linkedin": "Post", "twitter": "Thread", "tiktok": "Script", "fin": "Answer"}
+
+
+def succeeded(custom_id, text):
+    message = SimpleNamespace(content=[SimpleNamespace(text=text)], usage=SimpleNamespace(output_tokens=50))
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message))
+
+
+def errored(custom_id):
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored", error="overloaded"))
+
+
+class FakeBatches:
+    def __init__(self, outputs, fail_after=None):
+        self.outputs = outputs  # Per request, in submission order: text or None for an errored entry
+        self.fail_after = fail_after  # Raise while reading results after this many entries
+        self.created = []
+
+    def create(self, requests):
+        self.created.append([request["custom_id"] for request in requests])
+        return SimpleNamespace(id="batch_1")
+
+    def retrieve(self, batch_id):
+        return SimpleNamespace(processing_status="ended", request_counts=None)
+
+    def results(self, batch_id):
+        for n, (custom_id, text) in enumerate(zip(self.created[0], self.outputs)):
+            if n == self.fail_after:
+                raise ConnectionError("results stream dropped")
+            yield succeeded(custom_id, text) if text is not None else errored(custom_id)
+
+
+def fake_client(batches):
+    return SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+
+@pytest.fixture(autouse=True)
+def response_cache(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(generator, "get_response_cache", lambda: cache)
+    return cache
+
+
+def test_unparseable_entry_does_not_abort_the_batch(tmp_path):
+    truncated = json.dumps(CAMPAIGN)[:30]  # Output cut off at max_tokens
+    batches = FakeBatches([json.dumps(CAMPAIGN), truncated, None])
+    results = generator.generate_campaigns_batch(
+        ["post one", "post two", "post three"], client=fake_client(batches),
+        state_path=str(tmp_path / "state.json"), poll_interval=0
+    )
+
+    assert results[0] == CAMPAIGN
+    assert results[1] == {"error": "unparseable output"}
+    assert results[2]["error"].startswith("errored")
+    assert not (tmp_path / "state.json").exists()
+
+
+def test_results_collected_before_a_failure_are_kept(tmp_path):
+    texts = ["post one", "post two"]
+    state_path = str(tmp_path / "state.json")
+    outputs = [json.dumps(CAMPAIGN), json.dumps({**CAMPAIGN, "fin": "Second"})]
+
+    batches = FakeBatches(outputs, fail_after=1)
+    with pytest.raises(ConnectionError):
+        generator.generate_campaigns_batch(texts, client=fake_client(batches), state_path=state_path,
+                                           poll_interval=0, use_cache=False)
+    with open(state_path) as f:
+        state = json.load(f)
+    assert state["batch_id"] == "batch_1"
+    assert list(state["results"].values()) == [CAMPAIGN]
+
+    # The restart resumes the same batch instead of submitting a new one
+    retry = FakeBatches(outputs)
+    retry.created = batches.created
+    results = generator.generate_campaigns_batch(texts, client=fake_client(retry), state_path=state_path,
+                                                 poll_interval=0, use_cache=False)
+    assert results == [CAMPAIGN, {**CAMPAIGN, "fin": "Second"}]
+    assert len(retry.created) == 1
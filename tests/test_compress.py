@@ -0,0 +1,48 @@
+"""
+Compression stays within its token budget and keeps paragraph structure.
+"""
+
+import random
+
+import pytest
+
+from utils.compress import compress, estimate_tokens
+from utils.scraper import Article, Section
+
+WORDS = ("support resolution agent customer team article answer conversation metric owner "
+         "content review weekly channel inbox routing quality specialist").split()
+
+
+def make_text(paragraphs: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(paragraphs):
+        sentences = [
+            ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + '.'
+            for _ in range(rng.randint(2, 6))
+        ]
+        blocks.append(' '.join(sentences))
+    return '\n\n'.join(blocks)
+
+
+@pytest.mark.parametrize('budget', [50, 200, 1000, 1500])
+@pytest.mark.parametrize('paragraphs', [5, 40, 200])
+def test_compressed_text_fits_budget(budget, paragraphs):
+    text, stats = compress(make_text(paragraphs, seed=paragraphs), budget=budget)
+    assert stats['tokens_after'] <= budget
+    assert estimate_tokens(text) == stats['tokens_after']
+
+
+def test_article_body_keeps_paragraph_leads():
+    sections = [
+        Section(level=2, heading=f'Heading {n}', parts=[make_text(1, seed=n)]) for n in range(60)
+    ]
+    article = Article(sections=sections)
+    text, stats = compress(article.body, budget=1000)
+
+    assert stats['tokens_saved']
+    # Paragraphs survive, each led by its section heading and first sentence
+    paragraphs = text.split('\n\n')
+    assert len(paragraphs) >= 10
+    assert all(paragraph.startswith('Heading ') for paragraph in paragraphs)
+    assert '\n\n' not in compress(article.text, budget=1000)[0]
@@ -0,0 +1,85 @@
+"""
+DraftStore transcript storage and cleanup of abandoned sessions.
+"""
+
+import sqlite3
+import time
+
+from utils.drafts import DraftStore
+
+DAY = 86400
+
+
+def messages(*seqs):
+    return [{"role": "user", "content": f"message {seq}", "seq": seq} for seq in seqs]
+
+
+def test_transcript_round_trip(tmp_path):
+    store = DraftStore(str(tmp_path / "drafts.sqlite3"))
+    store.add_transcript("session", messages(0, 1, 2))
+    assert [m["seq"] for m in store.transcript("session", before_seq=3, limit=2)] == [1, 2]
+
+
+def test_abandoned_transcripts_are_deleted_on_open(tmp_path):
+    path = str(tmp_path / "drafts.sqlite3")
+    store = DraftStore(path)
+    store.add_transcript("old", messages(0, 1))
+    store.add_transcript("active", messages(0))
+    store.flush()
+    with store._conn:
+        store._conn.execute("UPDATE transcript SET created_at = ?", (time.time() - 30 * DAY,))
+    # A session still being written keeps its older rows
+    store.add_transcript("active", messages(1))
+    store.flush()
+
+    reopened = DraftStore(path)
+    assert reopened.transcript("old", before_seq=10, limit=10) == []
+    assert [m["seq"] for m in reopened.transcript("active", before_seq=10, limit=10)] == [0, 1]
+
+
+def test_prune_keeps_recent_transcripts(tmp_path):
+    store = DraftStore(str(tmp_path / "drafts.sqlite3"))
+    store.add_transcript("session", messages(0))
+    store.prune_transcripts(max_age_days=1)
+    assert len(store.transcript("session", before_seq=1, limit=1)) == 1
+
+
+def test_drafts_are_scoped_to_their_owner(tmp_path):
+    store = DraftStore(str(tmp_path / "drafts.sqlite3"))
+    mine = store.add("alice", "Alice's LinkedIn post about routing", preview="Alice's source")
+    theirs = store.add("bob", "Bob's LinkedIn post about routing", preview="Bob's source")
+
+    drafts, total = store.page("alice")
+    assert total == 1 and [d["id"] for d in drafts] == [mine]
+    assert [d["id"] for d in store.page("alice", query="routing")[0]] == [mine]
+    assert store.page("alice", query="Bob")[1] == 0
+    assert store.get("alice", theirs) is None
+    assert store.get_content("alice", theirs) == ""
+
+    store.update_content("alice", theirs, "Overwritten")
+    assert store.get_content("bob", theirs) == "Bob's LinkedIn post about routing"
+
+
+def test_search_without_fts_is_scoped_too(tmp_path):
+    store = DraftStore(str(tmp_path / "drafts.sqlite3"))
+    store.fts = False
+    store.add("alice", "Post about routing")
+    store.add("bob", "Another post about routing")
+    assert store.page("alice", query="routing")[1] == 1
+
+
+def test_databases_without_owners_are_upgraded(tmp_path):
+    path = str(tmp_path / "drafts.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE drafts (id TEXT PRIMARY KEY, created_at REAL NOT NULL, preview TEXT NOT NULL,"
+        " content TEXT NOT NULL, source_url TEXT, content_hash TEXT NOT NULL, formats TEXT NOT NULL DEFAULT '[]')"
+    )
+    conn.execute("INSERT INTO drafts VALUES ('old', 0, 'Old', 'Old draft', NULL, 'hash', '[]')")
+    conn.commit()
+    conn.close()
+
+    store = DraftStore(path)
+    assert store.page("alice")[1] == 0  # Ownerless drafts aren't shown to anyone
+    store.add("alice", "New draft")
+    assert store.count("alice") == 1
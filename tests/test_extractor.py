@@ -0,0 +1,51 @@
+"""
+Extraction quality on the saved fixture pages: each page's text is checked
+against its hand-copied reference body (page.txt next to page.html).
+"""
+
+import pathlib
+
+import pytest
+from bs4 import BeautifulSoup
+
+from bench_scraper import word_overlap
+from utils.extractor import NEGATIVE_HINTS, find_main_content
+from utils.scraper import extract_text
+
+PAGES = sorted((pathlib.Path(__file__).parent / 'fixtures' / 'pages').glob('*.html'))
+
+MIN_PRECISION = 0.9
+MIN_RECALL = 0.8  # Table cells aren't emitted (docs_page's tip)
+
+
+@pytest.mark.parametrize('page', PAGES, ids=lambda page: page.stem)
+def test_extraction_matches_reference(page):
+    reference = page.with_suffix('.txt').read_text(encoding='utf-8')
+    text = extract_text(page.read_bytes())
+
+    assert len(text) >= 0.8 * len(' '.join(reference.split()))
+    precision, recall = word_overlap(text, reference)
+    assert precision >= MIN_PRECISION
+    assert recall >= MIN_RECALL
+
+
+@pytest.mark.parametrize('hints', ['shared-layout', 'navbar-offset', 'menubar-fixed', 'tagline', 'bannerless'])
+def test_negative_hints_match_whole_words_only(hints):
+    assert not NEGATIVE_HINTS.search(hints)
+
+
+@pytest.mark.parametrize('hints', ['sidebar', 'post-comments', 'nav-menu', 'related_posts', 'share-bar', 'tags'])
+def test_negative_hints_match_boilerplate_names(hints):
+    assert NEGATIVE_HINTS.search(hints)
+
+
+def test_wrapper_with_negative_hint_around_article_is_kept():
+    soup = BeautifulSoup(
+        "<html><body><div class='layout has-sidebar'><div class='col'>"
+        "<p>The article body sits in an unhinted column, inside a wrapper named like a sidebar.</p>"
+        "<p>It is still the best candidate on the page, so the wrapper must not be dropped.</p>"
+        "</div></div></body></html>",
+        'html.parser'
+    )
+    nodes = find_main_content(soup)
+    assert 'best candidate' in ' '.join(node.get_text(' ') for node in nodes)
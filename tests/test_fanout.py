@@ -0,0 +1,64 @@
+"""
+stream_sections against a fake streaming client: prompt-cache warm-up
+holds the other formats only until the first response starts.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from utils import fanout
+
+LONG_SOURCE = "Support teams that own their AI agent resolve more conversations. " * 400
+SHORT_SOURCE = "A short post."
+
+
+class FakeStream:
+    def __init__(self, client, first_token_delay):
+        self.client = client
+        self.first_token_delay = first_token_delay
+        self.response = SimpleNamespace(headers={})
+
+    def __enter__(self):
+        with self.client.lock:
+            self.client.started.append(time.monotonic())
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        yield SimpleNamespace(type="message_start")
+        time.sleep(self.first_token_delay)
+        yield SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="Draft"))
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=10, output_tokens=1))
+
+
+class FakeClient:
+    def __init__(self, first_token_delay):
+        self.lock = threading.Lock()
+        self.started = []
+        self.messages = SimpleNamespace(stream=lambda **request: FakeStream(self, first_token_delay))
+
+
+def run(client, text):
+    return list(fanout.stream_sections(client, text, ["linkedin", "x_post", "youtube"]))
+
+
+def test_warm_up_releases_other_formats_when_the_response_starts():
+    client = FakeClient(first_token_delay=0.5)
+    events = run(client, LONG_SOURCE)
+
+    assert sorted(e[1:] for e in events if e[0] == "done") == [(t, "Draft") for t in ("linkedin", "x_post", "youtube")]
+    # The others started long before the first format's slow first token
+    assert max(client.started) - min(client.started) < 0.3
+
+
+def test_short_sources_skip_warm_up():
+    assert fanout.estimate_tokens(fanout.SECTION_SYSTEM_PROMPT + SHORT_SOURCE) < fanout.config.PROMPT_CACHE_MIN_TOKENS
+    client = FakeClient(first_token_delay=0.2)
+    events = run(client, SHORT_SOURCE)
+    assert sum(e[0] == "done" for e in events) == 3
+    assert max(client.started) - min(client.started) < 0.1
@@ -0,0 +1,84 @@
+"""
+fetch_html and FetchCache against a stub HTTP server on 127.0.0.1.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.cache import FetchCache
+from utils.scraper import fetch_html
+
+ETAG = '"v1"'
+LAST_MODIFIED = 'Tue, 04 Mar 2025 09:00:00 GMT'
+PAGE = b'<html><body><p>Cached page body.</p></body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests = []  # Headers of every request served, per test
+
+    def do_GET(self):
+        StubHandler.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    StubHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fresh_entry_makes_no_request(server, tmp_path):
+    cache = FetchCache(path=str(tmp_path / 'fetch.sqlite3'), ttl=3600)
+    assert fetch_html(f'{server}/post', cache=cache) == PAGE
+    assert len(StubHandler.requests) == 1
+
+    assert fetch_html(f'{server}/post', cache=cache) == PAGE
+    assert len(StubHandler.requests) == 1
+
+
+def test_stale_entry_is_revalidated_and_served_on_304(server, tmp_path):
+    cache = FetchCache(path=str(tmp_path / 'fetch.sqlite3'), ttl=0)
+    assert fetch_html(f'{server}/post', cache=cache) == PAGE
+
+    assert fetch_html(f'{server}/post', cache=cache) == PAGE
+    assert len(StubHandler.requests) == 2
+    conditional = StubHandler.requests[1]
+    assert conditional.get('If-None-Match') == ETAG
+    assert conditional.get('If-Modified-Since') == LAST_MODIFIED
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = FetchCache(path=str(tmp_path / 'fetch.sqlite3'), max_bytes=250, ttl=3600)
+    for name in ('a', 'b', 'c'):
+        cache.put(name, b'x' * 100)
+        time.sleep(0.01)
+    assert cache.get('a') is None  # 300 bytes > 250: the oldest went
+    assert cache.get('b') and cache.get('c')
+
+    time.sleep(0.01)
+    cache.get('b')  # Now more recently used than c
+    cache.put('d', b'x' * 100)
+    assert cache.get('c') is None
+    assert cache.get('b') and cache.get('d')
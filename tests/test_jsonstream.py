@@ -0,0 +1,120 @@
+"""
+ObjectStreamParser, and stream_campaign's fallback when a stream is malformed.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import generator
+from utils.cache import ResponseCache
+from utils.jsonstream import ObjectStreamParser
+
+CAMPAIGN = {
+    "linkedin": 'Say "hello" to {braces} and [brackets], \\ too',
+    "twitter": "1/ Thread",
+    "tiktok": "[Visual: desk] Script",
+    "fin": "Answer",
+}
+
+
+def feed_all(chunks) -> tuple:
+    parser = ObjectStreamParser()
+    pairs = []
+    for chunk in chunks:
+        pairs.extend(parser.feed(chunk))
+    return pairs, parser
+
+
+def test_values_split_across_chunk_boundaries():
+    text = json.dumps(CAMPAIGN)
+    for size in (1, 2, 3, 7):
+        pairs, parser = feed_all(text[i:i + size] for i in range(0, len(text), size))
+        assert dict(pairs) == CAMPAIGN
+        assert parser.done
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    pairs, _ = feed_all([json.dumps({"linkedin": 'He said "}" and \\"{"'})])
+    assert pairs == [("linkedin", 'He said "}" and \\"{"')]
+
+
+def test_pairs_are_returned_as_each_value_closes():
+    parser = ObjectStreamParser()
+    assert parser.feed('{"linkedin": "Post", "twit') == [("linkedin", "Post")]
+    assert parser.feed('ter": "Thread"}') == [("twitter", "Thread")]
+
+
+def test_nested_objects_and_arrays():
+    data = {"linkedin": {"hook": "Hi", "tags": ["a", {"b": [1, 2]}]}, "twitter": [["x"], []]}
+    pairs, parser = feed_all([json.dumps(data)])
+    assert dict(pairs) == data and parser.done
+
+
+def test_leading_json_fence_is_skipped():
+    pairs, parser = feed_all(["```json\n", json.dumps(CAMPAIGN), "\n```"])
+    assert dict(pairs) == CAMPAIGN and parser.done
+
+
+@pytest.mark.parametrize("text", ['{"linkedin": "Post"], "twitter": "x"}', '{"linkedin": [1, 2}'])
+def test_unbalanced_closers_are_malformed(text):
+    with pytest.raises(json.JSONDecodeError):
+        feed_all([text])
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.text_stream = iter(chunks)
+        self.response = SimpleNamespace(headers={})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=10, output_tokens=30))
+
+
+@pytest.fixture
+def streamed(tmp_path, monkeypatch):
+    """
+    Makes stream_campaign read the given chunks; returns the calls made to
+    _parse_campaign.
+    """
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(generator, "get_response_cache", lambda: cache)
+    fallbacks = []
+    parse_campaign = generator._parse_campaign
+
+    def spy(content):
+        fallbacks.append(content)
+        return parse_campaign(content)
+
+    monkeypatch.setattr(generator, "_parse_campaign", spy)
+
+    def stream(chunks):
+        client = SimpleNamespace(messages=SimpleNamespace(stream=lambda **request: FakeStream(chunks)))
+        monkeypatch.setattr(generator, "get_client", lambda api_key: client)
+        return list(generator.stream_campaign("A post.", api_key="test-key"))
+
+    stream.fallbacks = fallbacks
+    return stream
+
+
+def test_stream_campaign_yields_streamed_fields(streamed):
+    text = "```json\n" + json.dumps(CAMPAIGN) + "\n```"
+    assert dict(streamed([text[i:i + 5] for i in range(0, len(text), 5)])) == CAMPAIGN
+    assert streamed.fallbacks == []
+
+
+def test_malformed_stream_falls_back_to_parse_campaign(streamed):
+    chunks = ['{"linkedin": "Post", ', '"twitter": "Thread"], ', '"tiktok": "S", "fin": "A"}']
+    result = dict(streamed(chunks))
+
+    assert streamed.fallbacks == ["".join(chunks)]
+    assert result["linkedin"] == "Post"  # Streamed before the error
+    assert result["twitter"] == generator.PARSE_ERROR
+    assert result["fin"] == "".join(chunks)
@@ -0,0 +1,70 @@
+"""
+html.parser (the default) and lxml must extract the same text from the
+fixture pages, ignoring whitespace; on malformed markup the default must
+keep every piece of text.
+"""
+
+import pathlib
+
+import pytest
+
+from utils.scraper import DEFAULT_PARSER, extract_text
+
+PAGES = sorted((pathlib.Path(__file__).parent / 'fixtures' / 'pages').glob('*.html'))
+
+MALFORMED = {
+    'unclosed_p_before_div': (
+        b"<html><body><div class='post'>"
+        b"<p>First paragraph, it is long enough to count for scoring purposes."
+        b"<div><p>Second paragraph inside a div, with enough text to be scored too.</p></div>"
+        b"</div></body></html>",
+        ['scoring purposes', 'Second paragraph inside a div'],
+    ),
+    'nested_p': (
+        b"<html><body><article>"
+        b"<p>Outer paragraph text that is long, with commas, and more words here."
+        b"<p>Inner paragraph that a repairing parser splits off into a sibling.</p></p>"
+        b"</article></body></html>",
+        ['Outer paragraph text', 'Inner paragraph'],
+    ),
+    'stray_close_tags': (
+        b"<html><body><main>"
+        b"<p>Text before a stray closing tag, long enough to be scored as content.</span></div>"
+        b"<p>Text after the stray closing tag, also long enough to be scored.</p>"
+        b"</main></body></html>",
+        ['Text before a stray closing tag', 'Text after the stray closing tag'],
+    ),
+    # lxml closes the <p> at the <table> and loses the cell and trailing text
+    'table_in_unclosed_p': (
+        b"<html><body><div class='content'>"
+        b"<p>Intro paragraph sits before a table, with commas, to earn a score."
+        b"<table><tr><td>Cell text inside a table that sits inside an unclosed paragraph.</td></tr></table>"
+        b"Trailing text.</p></div></body></html>",
+        ['Intro paragraph', 'Cell text inside a table', 'Trailing text'],
+    ),
+}
+
+
+def squash(text: str) -> str:
+    return ''.join(text.split())
+
+
+def test_default_parser_is_html_parser():
+    assert DEFAULT_PARSER == 'html.parser'
+
+
+@pytest.mark.parametrize('page', PAGES, ids=lambda page: page.stem)
+def test_lxml_matches_default_on_fixture_pages(page):
+    pytest.importorskip('lxml')
+    html = page.read_bytes()
+    default = extract_text(html, parser='html.parser')
+    assert default
+    assert squash(extract_text(html, parser='lxml')) == squash(default)
+
+
+@pytest.mark.parametrize('name', MALFORMED)
+def test_default_parser_keeps_text_in_malformed_html(name):
+    html, expected = MALFORMED[name]
+    text = ' '.join(extract_text(html).split())
+    for phrase in expected:
+        assert phrase in text
@@ -0,0 +1,87 @@
+"""
+RateLimiter ordering and async waiters.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.ratelimit import BATCH, INTERACTIVE, RateLimiter
+
+
+def drained(requests_per_minute: float = 600) -> RateLimiter:
+    # 600/min refills one request every 0.1s
+    limiter = RateLimiter(requests_per_minute=requests_per_minute, tokens_per_minute=10**6)
+    limiter.requests.level = 0
+    return limiter
+
+
+def test_cancelled_async_waiter_takes_no_capacity():
+    limiter = drained()
+
+    async def run():
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert limiter._waiters == [] and limiter._async_waiters == {}
+    limiter.requests.refill(time.monotonic())
+    assert limiter.requests.level >= 1  # Refilled, and nothing was taken
+
+
+def test_async_waiter_does_not_block_the_loop():
+    limiter = drained()
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(limiter.acquire_async(), ticker())
+
+    asyncio.run(run())
+    assert len(ticks) == 5
+
+
+def test_async_waiters_are_served_by_priority():
+    limiter = drained()
+    served = []
+
+    async def acquire(name, priority):
+        await limiter.acquire_async(priority=priority)
+        served.append(name)
+
+    async def run():
+        batch = asyncio.create_task(acquire("batch", BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(acquire("interactive", INTERACTIVE))
+        await asyncio.gather(batch, interactive)
+
+    asyncio.run(run())
+    assert served == ["interactive", "batch"]
+
+
+def test_async_waiter_is_woken_by_a_blocking_caller():
+    # Behind a blocked thread the coroutine has no timer of its own; it must
+    # be woken when the thread is served and leaves the queue
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10**6)
+    limiter.pause(0.1)
+    thread = threading.Thread(target=limiter.acquire, args=(0, INTERACTIVE))
+    thread.start()
+    while not limiter._waiters:
+        time.sleep(0.001)
+
+    async def run():
+        await asyncio.wait_for(limiter.acquire_async(priority=BATCH), timeout=1)
+
+    asyncio.run(run())
+    thread.join()
+    assert limiter._waiters == []
@@ -0,0 +1,33 @@
+"""
+scrape_many: stopping early doesn't wait for the remaining URLs.
+"""
+
+import time
+
+from utils import scraper
+
+PAGE = b'<html><body><article><p>A paragraph long enough to be scored as the article body.</p></article></body></html>'
+
+
+def test_stopping_early_does_not_wait_for_remaining_urls(monkeypatch):
+    fetched = []
+
+    def fetch_html(url, cache=None, gate=None):
+        fetched.append(url)
+        if url != 'https://example.com/fast':
+            time.sleep(0.5)
+        return PAGE
+
+    monkeypatch.setattr(scraper, 'fetch_html', fetch_html)
+    urls = ['https://example.com/fast'] + [f'https://example.com/slow-{n}' for n in range(5)]
+
+    started = time.monotonic()
+    reports = scraper.scrape_many(urls, max_workers=1, cache=False)
+    first = next(reports)
+    reports.close()
+    elapsed = time.monotonic() - started
+
+    assert first.url == 'https://example.com/fast' and first.article
+    assert elapsed < 0.4
+    time.sleep(0.6)
+    assert len(fetched) <= 2  # The queued URLs were cancelled, not started
@@ -0,0 +1,81 @@
+"""
+generate_campaign_structured: how many calls each kind of failure costs.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from utils import generator
+from utils.cache import ResponseCache
+from utils.metrics import get_metrics, reset_metrics
+
+CAMPAIGN = {"linkedin": "Post", "twitter": "Thread", "tiktok": "Script", "fin": "Answer"}
+
+
+def tool_message(name=None, data=None):
+    blocks = [SimpleNamespace(type="tool_use", name=name, input=data)] if name else [SimpleNamespace(type="text", text="Sure!")]
+    return SimpleNamespace(content=blocks, usage=SimpleNamespace(output_tokens=20))
+
+
+@pytest.fixture
+def replies(tmp_path, monkeypatch):
+    """
+    Scripted replies for _create_message; records the tool each request forced.
+    """
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(generator, "get_response_cache", lambda: cache)
+    reset_metrics()
+    script = SimpleNamespace(messages=[], calls=[])
+
+    def create_message(client, request):
+        script.calls.append(request["tool_choice"]["name"])
+        return script.messages.pop(0)
+
+    monkeypatch.setattr(generator, "_create_message", create_message)
+    return script
+
+
+def generate():
+    return generator.generate_campaign_structured("A blog post about support.", api_key="test-key")
+
+
+def test_missing_tool_call_retries_save_campaign_once(replies):
+    replies.messages = [tool_message(), tool_message("save_campaign", CAMPAIGN)]
+    assert generate() == CAMPAIGN
+    assert replies.calls == ["save_campaign", "save_campaign"]
+
+
+def test_all_fields_failing_twice_gives_up_without_field_repairs(replies):
+    replies.messages = [tool_message(), tool_message("save_campaign", {key: "" for key in CAMPAIGN})]
+    assert set(generate().values()) == {generator.PARSE_ERROR}
+    assert replies.calls == ["save_campaign", "save_campaign"]
+
+    metrics = get_metrics()
+    assert (metrics["campaigns"], metrics["parse_failures"], metrics["campaign_retries"]) == (1, 1, 1)
+    assert metrics["parse_failure_rate"] == 1.0
+    assert metrics["wasted_output_tokens"] == 40
+
+
+def test_partial_failure_repairs_only_the_failed_field(replies):
+    replies.messages = [
+        tool_message("save_campaign", {**CAMPAIGN, "twitter": "  "}),
+        tool_message("save_asset", {"format": "twitter", "content": "Thread"}),
+    ]
+    assert generate() == CAMPAIGN
+    assert replies.calls == ["save_campaign", "save_asset"]
+
+    metrics = get_metrics()
+    assert (metrics["campaigns"], metrics["parse_failures"], metrics["field_repairs"]) == (1, 1, 1)
+    assert "campaign_retries" not in metrics
+
+
+def test_parse_failure_rate_stays_a_proportion(replies):
+    replies.messages = [
+        tool_message(), tool_message("save_campaign", {**CAMPAIGN, "fin": ""}),
+        tool_message("save_asset", {"format": "fin", "content": "Answer"}),
+        tool_message("save_campaign", CAMPAIGN),
+    ]
+    generate()
+    generator.generate_campaign_structured("Another post.", api_key="test-key")
+    assert get_metrics()["parse_failure_rate"] == 0.5
@@ -0,0 +1,225 @@
+# =============================================================================
+# Caches
+# ResponseCache: persistent, content-addressed cache for generated output.
+# Keys are hashes of everything that determines a generation (normalized
+# input, formats, system prompt, model), so a repeat request returns the
+# stored output without an API call.
+# FetchCache: HTTP cache for scraped pages with conditional revalidation.
+# Both are backed by SQLite so they survive restarts and can be shared by
+# app.py, utils/generator.py and utils/scraper.py in the same process.
+# =============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses whitespace so trivially different pastes share a cache entry.
+    """
+    return " ".join((text or "").split())
+
+
+def make_key(text: str, formats, system_prompt: str, model: str) -> str:
+    """
+    Builds a cache key from the normalized input text, the sorted format set,
+    the system prompt and the model id.
+    """
+    payload = json.dumps(
+        [normalize_text(text), sorted(formats or []), system_prompt, model],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed key/value cache with TTL and size-based (LRU) eviction.
+    Values are strings; callers store JSON for structured output.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl: float = None):
+        self.path = path or os.path.join(config.CACHE_DIR, "responses.sqlite3")
+        self.max_entries = max_entries or config.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else config.RESPONSE_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """
+        Returns the cached value, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def _evict(self, now: float):
+        # Expired entries first, then least recently used beyond the size cap
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide response cache, creating it on first use.
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+class FetchCache:
+    """
+    On-disk HTTP fetch cache for the scraper. Stores body, ETag and
+    Last-Modified per URL. Entries younger than `ttl` are served without any
+    network; older ones are revalidated with a conditional GET. The total
+    body size is capped at `max_bytes`, evicting least recently used URLs.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None, ttl: float = None):
+        self.path = path or os.path.join(config.CACHE_DIR, "fetch.sqlite3")
+        self.max_bytes = max_bytes or config.FETCH_CACHE_MAX_BYTES
+        self.ttl = ttl if ttl is not None else config.FETCH_CACHE_TTL
+        self._lock = threading.Lock()
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetches ("
+            " url TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_accessed ON fetches(accessed_at)")
+        self._conn.commit()
+
+    def get(self, url: str):
+        """
+        Returns {"body", "etag", "last_modified", "fresh"} for a cached URL,
+        or None. `fresh` is False once the entry is older than the TTL.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM fetches WHERE url = ?", (url,)
+            ).fetchone()
+            if not row:
+                return None
+            self._conn.execute("UPDATE fetches SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+        return {
+            "body": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "fresh": now - row[3] < self.ttl,
+        }
+
+    def put(self, url: str, body: bytes, etag: str = None, last_modified: str = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetches (url, body, etag, last_modified, size, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, len(body), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def revalidated(self, url: str):
+        """
+        Marks an entry fresh again after the server answered 304 Not Modified.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE fetches SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used URLs until the total size fits
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM fetches").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM fetches ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM fetches WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_fetch_cache = None
+_fetch_cache_lock = threading.Lock()
+
+
+def get_fetch_cache() -> FetchCache:
+    """
+    Returns the process-wide fetch cache, creating it on first use.
+    """
+    global _fetch_cache
+    with _fetch_cache_lock:
+        if _fetch_cache is None:
+            _fetch_cache = FetchCache()
+        return _fetch_cache
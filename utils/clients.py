@@ -0,0 +1,54 @@
+# =============================================================================
+# Client Registry
+# Long-lived Anthropic clients shared across the process, so connection pools
+# survive between generations instead of being rebuilt on every call.
+# Sync clients are shared by API key. Async clients are also keyed by event
+# loop, because an httpx async pool can't be shared between loops.
+# SDK retries are turned off: utils/ratelimit.py schedules retries so they
+# respect the shared rate limit and request priority.
+# =============================================================================
+
+import asyncio
+import threading
+import weakref
+
+import anthropic
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> anthropic.Anthropic:
+    """
+    Returns the shared synchronous client for an API key.
+    """
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+            _clients[api_key] = client
+        return client
+
+
+def get_async_client(api_key: str) -> anthropic.AsyncAnthropic:
+    """
+    Returns the shared async client for an API key on the running event loop.
+    Uses HTTP/2 when the h2 package is installed, so many concurrent
+    requests are multiplexed over a few connections.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            http_client = anthropic.DefaultAsyncHttpxClient(http2=True) if HTTP2 else None
+            client = anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client, max_retries=0)
+            clients[api_key] = client
+        return client
@@ -0,0 +1,123 @@
+# =============================================================================
+# Input Compression
+# Shrinks long source text to a token budget before generation. Cheap passes
+# run first (duplicate and boilerplate sentences, low-information
+# paragraphs); if the text is still over budget, sentences are ranked by
+# term frequency and the top ones are kept in their original order, always
+# keeping each paragraph's lead sentence.
+# =============================================================================
+
+import re
+from collections import Counter
+
+import config
+
+CHARS_PER_TOKEN = 4  # Rough English average; close enough for budgeting
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=["“\'(\[]?[A-Z0-9])')
+WORD = re.compile(r"[a-z0-9']+")
+BOILERPLATE = re.compile(
+    r'subscribe|sign up|newsletter|cookie|all rights reserved|share this|click here|'
+    r'read more|follow us|related posts?|leave a comment|privacy policy|terms of service',
+    re.I
+)
+STOPWORDS = set("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in into is it its
+just more most my no not of on or our out so than that the their them then there these they this those to too up us
+was we were what when where which while who why will with would you your
+""".split())
+
+MIN_PARAGRAPH_WORDS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compress(text: str, budget: int = None):
+    """
+    Returns (text, stats) where text fits `budget` tokens (default
+    config.INPUT_TOKEN_BUDGET) and stats reports tokens_before,
+    tokens_after and tokens_saved. Text already within budget is returned
+    unchanged.
+    """
+    budget = budget or config.INPUT_TOKEN_BUDGET
+    before = estimate_tokens(text)
+    if before <= budget:
+        return text, _stats(before, before)
+
+    paragraphs = _clean_paragraphs(text)
+    compressed = _join(paragraphs)
+    if estimate_tokens(compressed) > budget:
+        # Fall back to a hard cut if no sentence fits (e.g. one giant run-on)
+        compressed = _join(_summarize(paragraphs, budget)) or compressed[:budget * CHARS_PER_TOKEN]
+
+    return compressed, _stats(before, estimate_tokens(compressed))
+
+
+def _clean_paragraphs(text: str) -> list:
+    # Split into paragraphs of sentences, dropping repeats and boilerplate
+    seen = set()
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        sentences = []
+        for sentence in SENTENCE_SPLIT.split(" ".join(block.split())):
+            key = " ".join(WORD.findall(sentence.lower()))
+            if not key or key in seen:
+                continue
+            if BOILERPLATE.search(sentence) and len(key.split()) < 25:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+        if sentences:
+            paragraphs.append(sentences)
+
+    # Very short paragraphs (bylines, captions, CTAs) only matter when there's
+    # real body text around them
+    if len(paragraphs) > 1:
+        paragraphs = [p for p in paragraphs if len(" ".join(p).split()) >= MIN_PARAGRAPH_WORDS] or paragraphs
+    return paragraphs
+
+
+def _summarize(paragraphs: list, budget: int) -> list:
+    # Extractive pass: keep lead sentences, then the highest-scoring rest
+    frequencies = Counter(
+        word for p in paragraphs for s in p for word in WORD.findall(s.lower()) if word not in STOPWORDS
+    )
+
+    def score(sentence):
+        words = [w for w in WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        return sum(frequencies[w] for w in words) / (len(words) + 1) if words else 0.0
+
+    positions = [(i, j) for i, p in enumerate(paragraphs) for j in range(len(p))]
+    leads = [(i, 0) for i in range(len(paragraphs))]
+    ranked = sorted((pos for pos in positions if pos[1]), key=lambda pos: -score(paragraphs[pos[0]][pos[1]]))
+
+    # Count the separators _join() adds: " " between sentences and "\n\n"
+    # between paragraphs (none before the first)
+    budget_chars = budget * CHARS_PER_TOKEN
+    keep = set()
+    opened = set()  # Paragraphs with a kept sentence
+    used = -2
+    for i, j in leads + ranked:
+        length = len(paragraphs[i][j]) + (1 if i in opened else 2)
+        if used + length > budget_chars:
+            continue
+        keep.add((i, j))
+        opened.add(i)
+        used += length
+
+    summary = []
+    for i, p in enumerate(paragraphs):
+        kept = [s for j, s in enumerate(p) if (i, j) in keep]
+        if kept:
+            summary.append(kept)
+    return summary
+
+
+def _join(paragraphs: list) -> str:
+    return "\n\n".join(" ".join(p) for p in paragraphs)
+
+
+def _stats(before: int, after: int) -> dict:
+    return {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
@@ -0,0 +1,90 @@
+# =============================================================================
+# Conversation Context
+# Builds a bounded request context for chat follow-ups, so "make the LinkedIn
+# one shorter" works without re-pasting the article:
+#   - the source article goes in the system prompt as its own cached block,
+#     so refinement turns read it from the prompt cache;
+#   - older turns are folded into a rolling summary (by a small model, a few
+#     turns at a time), which is kept on the transcript;
+#   - the most recent turns are sent verbatim.
+# =============================================================================
+
+import config
+from utils.formats import CHAT_SYSTEM_PROMPT
+from utils.ratelimit import INTERACTIVE, call_with_retry
+from utils.usage import CACHE_CONTROL
+
+SOURCE_PLACEHOLDER = "[Shared the source article; it is in the system prompt.]"
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and Content Fin, an AI copywriter.
+Update the summary with the new messages. Keep the user's requests and feedback, which drafts were produced
+and any decisions or preferences. Be brief: at most 150 words. Reply with the summary only."""
+
+
+def build_context(client, transcript) -> tuple:
+    """
+    Returns (system, messages) for the next reply. The transcript's last
+    message is the user's new prompt.
+    """
+    recent_start = max(0, len(transcript) - config.CONTEXT_RECENT_MESSAGES)
+    _update_summary(client, transcript, recent_start)
+
+    system = [{"type": "text", "text": CHAT_SYSTEM_PROMPT}]
+    if transcript.source:
+        system.append({
+            "type": "text",
+            "text": f"The source article the user is working from:\n\n{transcript.source}",
+            "cache_control": CACHE_CONTROL,
+        })
+    if transcript.summary:
+        system.append({"type": "text", "text": f"Summary of the earlier conversation:\n\n{transcript.summary}"})
+    system[-1] = {**system[-1], "cache_control": CACHE_CONTROL}
+
+    # Turns not yet folded into the summary are sent as they are (capped, in
+    # case summarizing keeps failing)
+    start = max(transcript.summarized_upto, recent_start - config.CONTEXT_SUMMARY_BATCH)
+    return system, _turns(transcript.between(start, len(transcript)), bool(transcript.summary))
+
+
+def _turns(history: list, summarized: bool) -> list:
+    # API messages must alternate and start with the user. A leading assistant
+    # turn is kept (behind a stub) only if it follows summarized conversation.
+    messages = []
+    if history and history[0]["role"] == "assistant" and summarized:
+        messages.append({"role": "user", "content": "(Earlier conversation is summarized in the system prompt.)"})
+    for message in history:
+        content = SOURCE_PLACEHOLDER if message.get("source") else message["content"]
+        content = content[:config.CONTEXT_MESSAGE_MAX_CHARS]
+        if messages and messages[-1]["role"] == message["role"]:
+            messages[-1]["content"] += f"\n\n{content}"
+        elif messages or message["role"] == "user":
+            messages.append({"role": message["role"], "content": content})
+    return messages
+
+
+def _update_summary(client, transcript, recent_start: int):
+    # Fold older turns into the summary once enough have accumulated
+    if recent_start - transcript.summarized_upto < config.CONTEXT_SUMMARY_BATCH:
+        return
+    lines = []
+    for message in transcript.between(transcript.summarized_upto, recent_start):
+        content = SOURCE_PLACEHOLDER if message.get("source") else message["content"]
+        lines.append(f"{message['role'].upper()}: {content[:config.CONTEXT_MESSAGE_MAX_CHARS]}")
+    request = {
+        "model": config.SUMMARY_MODEL,
+        "max_tokens": config.SUMMARY_MAX_TOKENS,
+        "system": SUMMARY_PROMPT,
+        "messages": [{
+            "role": "user",
+            "content": f"Current summary:\n{transcript.summary or '(none)'}\n\nNew messages:\n" + "\n\n".join(lines),
+        }],
+    }
+    try:
+        message = call_with_retry(lambda: client.messages.create(**request), priority=INTERACTIVE)
+    except Exception as e:
+        # Keep the old summary; the unsummarized turns are still sent verbatim
+        print(f"[context] Summary update failed: {e}")
+        return
+    transcript.summary = message.content[0].text.strip()
+    transcript.summarized_upto = recent_start
+    print(f"[context] Summarized turns up to seq {recent_start}")
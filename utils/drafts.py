@@ -0,0 +1,298 @@
+# =============================================================================
+# Draft Store
+# Durable draft history in SQLite (WAL mode), replacing the per-session list
+# that was lost on refresh or restart. Writes are queued to a background
+# writer thread with its own connection, so the chat path never waits on
+# disk; reads use a separate connection and see every write queued before
+# them.
+# Previews and content are indexed with SQLite FTS5 for search (falling back
+# to LIKE where FTS5 isn't compiled in). Listings are paged and leave out the
+# content, which is loaded per draft only when it is opened.
+# Every draft belongs to an owner (a per-browser id, see app.py); reads and
+# updates only ever see the caller's own drafts.
+# The same database holds chat messages that have scrolled out of a
+# session's transcript window (see utils/transcript.py). Sessions end
+# without telling the store, so transcripts not written to for
+# TRANSCRIPT_MAX_AGE_DAYS are deleted when the store opens and hourly after.
+# =============================================================================
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+
+TRANSCRIPT_PRUNE_INTERVAL = 3600  # Seconds between transcript cleanups while running
+
+
+class DraftStore:
+    """
+    Stores generated drafts with indexed owner, created_at, source_url and
+    content_hash columns. Draft ids are assigned up front, so add() returns
+    immediately and later updates can refer to a draft still being written.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.DRAFTS_DB_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS drafts ("
+            " id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " preview TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " source_url TEXT,"
+            " content_hash TEXT NOT NULL,"
+            " formats TEXT NOT NULL DEFAULT '[]',"
+            " owner TEXT NOT NULL DEFAULT '');"
+            "CREATE INDEX IF NOT EXISTS idx_drafts_created ON drafts(created_at);"
+            "CREATE INDEX IF NOT EXISTS idx_drafts_source ON drafts(source_url);"
+            "CREATE INDEX IF NOT EXISTS idx_drafts_hash ON drafts(content_hash);"
+            "CREATE TABLE IF NOT EXISTS transcript ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " message TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq));"
+        )
+        self._add_owner_column()
+        self.fts = self._create_search_index()
+        self._conn.commit()
+
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="draft-writer", daemon=True)
+        self._writer.start()
+        self._pruned_at = 0.0
+        self.prune_transcripts()
+
+    def _add_owner_column(self):
+        # Databases from before drafts had owners. Their drafts keep owner ''
+        # and aren't listed for anyone.
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(drafts)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE drafts ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_drafts_owner ON drafts(owner, created_at)")
+
+    def _create_search_index(self) -> bool:
+        # External-content FTS5 table kept in sync by triggers
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'drafts_fts'"
+        ).fetchone()
+        try:
+            self._conn.executescript(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS drafts_fts"
+                " USING fts5(preview, content, content='drafts', content_rowid='rowid');"
+                "CREATE TRIGGER IF NOT EXISTS drafts_fts_insert AFTER INSERT ON drafts BEGIN"
+                " INSERT INTO drafts_fts(rowid, preview, content) VALUES (new.rowid, new.preview, new.content);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS drafts_fts_delete AFTER DELETE ON drafts BEGIN"
+                " INSERT INTO drafts_fts(drafts_fts, rowid, preview, content)"
+                " VALUES ('delete', old.rowid, old.preview, old.content);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS drafts_fts_update AFTER UPDATE ON drafts BEGIN"
+                " INSERT INTO drafts_fts(drafts_fts, rowid, preview, content)"
+                " VALUES ('delete', old.rowid, old.preview, old.content);"
+                " INSERT INTO drafts_fts(rowid, preview, content) VALUES (new.rowid, new.preview, new.content);"
+                " END;"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"[drafts] FTS5 unavailable, search falls back to LIKE: {e}")
+            return False
+        if not exists:
+            # Index drafts written before the search index existed
+            self._conn.execute("INSERT INTO drafts_fts(drafts_fts) VALUES ('rebuild')")
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips an fsync per commit
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Writes (queued) ---
+
+    def add(self, owner: str, content: str, preview: str = "", source_url: str = None, formats: list = None) -> str:
+        """
+        Queues a new draft for `owner` and returns its id.
+        """
+        draft_id = uuid.uuid4().hex
+        row = {
+            "id": draft_id,
+            "owner": owner,
+            "created_at": time.time(),
+            "preview": preview,
+            "content": content,
+            "source_url": source_url,
+            "content_hash": content_hash(content),
+            "formats": json.dumps(formats or []),
+        }
+        self._writes.put((
+            "INSERT OR REPLACE INTO drafts (id, owner, created_at, preview, content, source_url, content_hash, formats)"
+            " VALUES (:id, :owner, :created_at, :preview, :content, :source_url, :content_hash, :formats)",
+            row
+        ))
+        return draft_id
+
+    def update_content(self, owner: str, draft_id: str, content: str):
+        """
+        Queues a replacement of one of `owner`'s drafts' content (and its hash).
+        """
+        self._writes.put((
+            "UPDATE drafts SET content = ?, content_hash = ? WHERE id = ? AND owner = ?",
+            (content, content_hash(content), draft_id, owner)
+        ))
+
+    def add_transcript(self, session_id: str, messages: list):
+        """
+        Queues chat messages (dicts with a "seq") for a session's transcript.
+        """
+        now = time.time()
+        for message in messages:
+            self._writes.put((
+                "INSERT OR REPLACE INTO transcript (session_id, seq, created_at, message) VALUES (?, ?, ?, ?)",
+                (session_id, message["seq"], now, json.dumps(message))
+            ))
+        if now - self._pruned_at > TRANSCRIPT_PRUNE_INTERVAL:
+            self.prune_transcripts()
+
+    def delete_transcript(self, session_id: str):
+        self._writes.put(("DELETE FROM transcript WHERE session_id = ?", (session_id,)))
+
+    def prune_transcripts(self, max_age_days: float = None):
+        """
+        Queues deletion of every session transcript whose newest message is
+        older than `max_age_days` (default config.TRANSCRIPT_MAX_AGE_DAYS).
+        """
+        self._pruned_at = time.time()
+        cutoff = self._pruned_at - (max_age_days or config.TRANSCRIPT_MAX_AGE_DAYS) * 86400
+        self._writes.put((
+            "DELETE FROM transcript WHERE session_id IN"
+            " (SELECT session_id FROM transcript GROUP BY session_id HAVING MAX(created_at) < ?)",
+            (cutoff,)
+        ))
+
+    def flush(self):
+        """
+        Blocks until every queued write has been committed.
+        """
+        self._writes.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            sql, params = self._writes.get()
+            try:
+                # Commit whatever else is already queued in the same transaction
+                batch = [(sql, params)]
+                while True:
+                    try:
+                        batch.append(self._writes.get_nowait())
+                    except queue.Empty:
+                        break
+                with conn:
+                    for sql, params in batch:
+                        conn.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"[drafts] Write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    # --- Reads ---
+
+    def get(self, owner: str, draft_id: str):
+        """
+        Returns one of `owner`'s drafts as a dict, or None.
+        """
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM drafts WHERE id = ? AND owner = ?", (draft_id, owner)
+            ).fetchone()
+        return _draft(row) if row else None
+
+    def get_content(self, owner: str, draft_id: str) -> str:
+        draft = self.get(owner, draft_id)
+        return draft["content"] if draft else ""
+
+    def page(self, owner: str, page: int = 0, per_page: int = 20, query: str = None) -> tuple:
+        """
+        Returns (drafts, total) for one page of `owner`'s drafts, newest
+        first, optionally filtered by a search query. Drafts carry everything
+        but the content; use get_content() when one is opened.
+        """
+        where, params = self._filter(owner, query)
+        self.flush()
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM drafts {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT id, owner, created_at, preview, source_url, content_hash, formats"
+                f" FROM drafts {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, per_page, page * per_page)
+            ).fetchall()
+        return [_draft(row) for row in rows], total
+
+    def transcript(self, session_id: str, before_seq: int, limit: int) -> list:
+        """
+        Returns up to `limit` stored messages just before `before_seq`, oldest first.
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM transcript WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before_seq, limit)
+            ).fetchall()
+        return [json.loads(row["message"]) for row in reversed(rows)]
+
+    def count(self, owner: str) -> int:
+        return self.page(owner, per_page=0)[1]
+
+    def _filter(self, owner: str, query: str) -> tuple:
+        # WHERE clause for the owner's drafts, optionally matching a search
+        terms = (query or "").split()
+        if not terms:
+            return "WHERE owner = ?", (owner,)
+        if self.fts:
+            # Quote each term so user input can't form FTS syntax; prefix-match the last
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in terms) + "*"
+            return ("WHERE owner = ? AND rowid IN (SELECT rowid FROM drafts_fts WHERE drafts_fts MATCH ?)",
+                    (owner, match))
+        clauses = " AND ".join("(preview LIKE ? OR content LIKE ?)" for _ in terms)
+        params = tuple(param for term in terms for param in (f"%{term}%", f"%{term}%"))
+        return f"WHERE owner = ? AND {clauses}", (owner, *params)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _draft(row: sqlite3.Row) -> dict:
+    draft = dict(row)
+    if "formats" in draft:
+        draft["formats"] = json.loads(draft["formats"])
+    return draft
+
+
+_draft_store = None
+_draft_store_lock = threading.Lock()
+
+
+def get_draft_store() -> DraftStore:
+    """
+    Returns the process-wide draft store, creating it on first use.
+    """
+    global _draft_store
+    with _draft_store_lock:
+        if _draft_store is None:
+            _draft_store = DraftStore()
+        return _draft_store
@@ -0,0 +1,153 @@
+# =============================================================================
+# Main-Content Extractor
+# Readability-style scoring to isolate the article body of a page instead of
+# taking the first <article>/<main> or the whole <body>. Paragraphs vote for
+# their parent and grandparent by text length and comma count; candidates are
+# weighted by class/id hints and penalised by link density. Comment threads,
+# related-post lists and share bars are pruned from the winner.
+# =============================================================================
+
+import re
+
+# Elements that never carry article text
+STRIP_TAGS = ['script', 'style', 'noscript', 'nav', 'footer', 'header', 'iframe', 'aside', 'form', 'button']
+
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|post|text|blog|story', re.I)
+# Negative hints match whole words of a class/id ("sidebar", "nav-menu",
+# "comments"), not substrings, so wrappers like "shared-layout" or
+# "navbar-offset" aren't mistaken for boilerplate
+NEGATIVE_HINTS = re.compile(
+    r'(?<![a-z])(?:comment|related|share|social|sidebar|promo|newsletter|subscribe|signup|footer|'
+    r'nav|navigation|menu|breadcrumb|cookie|banner|popup|modal|advert|sponsor|widget|author-bio|tag)s?(?![a-z])',
+    re.I
+)
+
+SCORED_TAGS = ('p', 'pre', 'td', 'blockquote')
+TAG_WEIGHTS = {
+    'article': 10, 'main': 5, 'div': 5, 'section': 3,
+    'pre': 3, 'td': 3, 'blockquote': 3,
+    'ol': -3, 'ul': -3, 'dl': -3, 'li': -3, 'form': -3,
+    'h1': -5, 'h2': -5, 'h3': -5, 'h4': -5, 'th': -5,
+}
+PRUNE_TAGS = ['ul', 'ol', 'div', 'section', 'table']
+
+MIN_PARAGRAPH_CHARS = 25
+SIBLING_THRESHOLD = 0.2      # Siblings scoring this share of the winner are kept
+MAX_LINK_DENSITY = 0.5       # Blocks with more linked text than this are pruned
+
+
+def find_main_content(soup) -> list:
+    """
+    Returns the element(s) holding the article body, in document order.
+    Mutates `soup`: boilerplate tags and unlikely blocks are removed.
+    """
+    for element in soup(STRIP_TAGS):
+        element.decompose()
+
+    # Score once before dropping unlikely blocks, so the block holding the
+    # best candidate is never dropped, then again without them
+    scores = _score_candidates(soup)
+    top = _top(scores)
+    _drop_unlikely(soup, keep=[top] if top is not None else [])
+    scores = _score_candidates(soup)
+    top = _top(scores)
+    if top is None:
+        return [soup.body or soup]
+
+    top_score = scores[id(top)][1]
+    threshold = max(10, top_score * SIBLING_THRESHOLD)
+
+    # Articles are often split across sibling blocks (e.g. around an image)
+    nodes = [top]
+    if top.parent is not None:
+        nodes = [
+            sibling for sibling in top.parent.find_all(recursive=False)
+            if sibling is top or scores.get(id(sibling), (None, 0))[1] >= threshold
+        ]
+
+    for node in nodes:
+        _prune(node)
+    return nodes
+
+
+def class_weight(element) -> int:
+    """
+    +25 / -25 for positive / negative hints in the element's class and id.
+    """
+    hints = ' '.join(element.get('class') or []) + ' ' + (element.get('id') or '')
+    weight = 0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    return weight
+
+
+def link_density(element) -> float:
+    text_length = len(element.get_text(strip=True))
+    if not text_length:
+        return 0.0
+    link_length = sum(len(a.get_text(strip=True)) for a in element.find_all('a'))
+    return link_length / text_length
+
+
+def _drop_unlikely(soup, keep=()):
+    # Blocks that look like boilerplate by name and carry no positive hint.
+    # Anything wrapping an <article>/<main> or a block in `keep` stays.
+    protected = set()
+    for element in [*soup.find_all(['article', 'main']), *keep]:
+        protected.add(id(element))
+        protected.update(id(parent) for parent in element.parents)
+
+    for element in soup.find_all(['div', 'section', 'ul', 'ol']):
+        if element.decomposed or id(element) in protected:
+            continue
+        hints = ' '.join(element.get('class') or []) + ' ' + (element.get('id') or '')
+        if NEGATIVE_HINTS.search(hints) and not POSITIVE_HINTS.search(hints):
+            element.decompose()
+
+
+def _top(scores: dict):
+    if not scores:
+        return None
+    return max(scores.values(), key=lambda entry: entry[1])[0]
+
+
+def _score_candidates(soup) -> dict:
+    # Keyed by id(): bs4 tags compare equal by content, not identity
+    scores = {}
+
+    def add(element, score):
+        key = id(element)
+        if key not in scores:
+            scores[key] = [element, TAG_WEIGHTS.get(element.name, 0) + class_weight(element)]
+        scores[key][1] += score
+
+    for paragraph in soup.find_all(SCORED_TAGS):
+        text = paragraph.get_text(' ', strip=True)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+
+        parent = paragraph.parent
+        if parent is None or parent.name in ('[document]', 'html'):
+            continue
+        add(parent, score)
+        grandparent = parent.parent
+        if grandparent is not None and grandparent.name not in ('[document]', 'html'):
+            add(grandparent, score / 2)
+
+    # Penalise candidates that are mostly links
+    return {
+        key: (element, score * (1 - link_density(element)))
+        for key, (element, score) in scores.items()
+    }
+
+
+def _prune(node):
+    # Link-heavy or negatively hinted blocks inside the article body
+    for element in node.find_all(PRUNE_TAGS):
+        if element.decomposed:
+            continue
+        if class_weight(element) < 0 or link_density(element) > MAX_LINK_DENSITY:
+            element.decompose()
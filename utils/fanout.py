@@ -0,0 +1,119 @@
+# =============================================================================
+# Fan-out Generation
+# Generates each selected output format with its own streaming request.
+# Requests run concurrently on a thread pool, so wall-clock time tracks the
+# slowest format rather than the sum of all of them. Worker threads never
+# touch Streamlit; they push events onto a queue that the caller drains on
+# the script thread.
+#
+# Every request shares the same prefix (system prompt + source text), which
+# is marked for prompt caching. When the source is long enough to be cached,
+# the first request warms the cache and the others start as soon as its
+# response begins (or after PROMPT_CACHE_WARMUP_TIMEOUT), so they read the
+# prefix instead of re-processing it. Shorter sources start all at once.
+# =============================================================================
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.compress import estimate_tokens
+from utils.formats import SECTION_SYSTEM_PROMPT, section_instruction
+from utils.ratelimit import BATCH, INTERACTIVE, call_with_retry, estimate_request_tokens, stream_with_retry
+from utils.usage import CACHE_CONTROL, format_usage, usage_dict
+
+
+def section_request(text: str, content_type: str) -> dict:
+    """
+    Builds messages.stream() kwargs for one format. The cacheable prefix
+    (system prompt, then source text) comes first; the format instruction
+    comes last so it is the only part that differs between formats.
+    """
+    return {
+        "model": config.CHAT_MODEL,
+        "max_tokens": config.SECTION_MAX_TOKENS,
+        "system": [{"type": "text", "text": SECTION_SYSTEM_PROMPT}],
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": f"Here is the content to repurpose:\n\n{text}", "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": section_instruction(content_type)},
+            ]
+        }],
+    }
+
+
+def warm_prompt_cache(client, text: str, content_type: str) -> bool:
+    """
+    Writes the shared prefix for `text` to the prompt cache ahead of time
+    with a 1-token request, so the real fan-out starts on cache reads.
+    Returns False without calling the API if the prefix is too short to cache.
+    """
+    if estimate_tokens(SECTION_SYSTEM_PROMPT + text) < config.PROMPT_CACHE_MIN_TOKENS:
+        return False
+    request = {**section_request(text, content_type), "max_tokens": 1}
+    message = call_with_retry(lambda: client.messages.create(**request),
+                              priority=BATCH, tokens=estimate_request_tokens(request))
+    print(f"[fanout] Prompt cache warmed: {format_usage(usage_dict(message.usage))}")
+    return True
+
+
+def stream_sections(client, text: str, content_types: list, max_workers: int = None):
+    """
+    Streams one request per content type and yields events as they arrive:
+
+        ("delta", content_type, text_chunk)
+        ("usage", content_type, usage_dict)
+        ("done", content_type, full_text)
+        ("error", content_type, exception)
+
+    Exactly one "done" or "error" event is yielded per content type.
+    """
+    content_types = list(content_types)
+    if not content_types:
+        return
+
+    events = queue.Queue()
+    workers = min(max_workers or config.FANOUT_MAX_WORKERS, len(content_types))
+
+    # Only worth waiting for a warm cache if the prefix can be cached at all
+    cacheable = estimate_tokens(SECTION_SYSTEM_PROMPT + text) >= config.PROMPT_CACHE_MIN_TOKENS
+    warm_first = config.PROMPT_CACHE_WARMUP and cacheable and len(content_types) > 1
+    warmed = threading.Event()
+
+    def run(content_type, is_first):
+        if warm_first and not is_first:
+            warmed.wait(timeout=config.PROMPT_CACHE_WARMUP_TIMEOUT)
+        try:
+            parts = []
+            with stream_with_retry(client, INTERACTIVE, **section_request(text, content_type)) as stream:
+                for event in stream:
+                    # The first event (message_start) follows the prompt
+                    # prefill, so the prefix is cached by now
+                    warmed.set()
+                    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        parts.append(event.delta.text)
+                        events.put(("delta", content_type, event.delta.text))
+                usage = usage_dict(stream.get_final_message().usage)
+            events.put(("usage", content_type, usage))
+            events.put(("done", content_type, "".join(parts)))
+        except Exception as e:
+            events.put(("error", content_type, e))
+        finally:
+            warmed.set()
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout")
+    try:
+        for i, content_type in enumerate(content_types):
+            executor.submit(run, content_type, i == 0)
+
+        remaining = len(content_types)
+        while remaining:
+            event = events.get()
+            if event[0] in ("done", "error"):
+                remaining -= 1
+            yield event
+    finally:
+        # If the caller stops early, don't start formats that haven't begun
+        executor.shutdown(wait=False, cancel_futures=True)
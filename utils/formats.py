@@ -0,0 +1,95 @@
+# =============================================================================
+# Output Formats
+# Prompts, per-format headings and writing instructions for the chat interface.
+# Each selected format is generated by its own request (see utils/fanout.py).
+# All formats share one system prompt and the source text, which form the
+# cached prompt prefix; only the closing instruction differs per format.
+# =============================================================================
+
+CHAT_SYSTEM_PROMPT = """You are Content Fin, Intercom's AI copywriter.
+
+Intercom's Voice:
+- CONFIDENT: "We built X," not "We tried to build X."
+- SIMPLE: Short sentences. No jargon.
+- FUTURIST: Excited about AI.
+- PUNCHY: Sentence fragments.
+- NO HASHTAGS ever.
+
+Always start with "**Content Fin**" on its own line."""
+
+FORMAT_HEADINGS = {
+    "linkedin": "**💼 LinkedIn Post**",
+    "x_post": "**𝕏 Post**",
+    "youtube": "**🎬 YouTube Script (2-3 min)**",
+    "finn": "**🤖 Fin Answer (RAG)**",
+    "landing": "**🏠 Landing Page Copy**",
+    "email": "**📧 Email Campaign**",
+    "seo": "**🔍 SEO Headlines & Meta**",
+}
+
+FORMAT_INSTRUCTIONS = {
+    "linkedin": """[Write a scroll-stopping LinkedIn post. Start with a contrarian hook. Short lines. End with a question. NO HASHTAGS.]""",
+    "x_post": """[Write a single punchy X post. Max 280 chars. Insight-heavy. NO HASHTAGS. NOT a thread.]""",
+    "youtube": """[Write a talking head script with [Visual Cues] in brackets. Conversational but professional tone.]""",
+    "finn": """[Write a factual, dense summary optimized for AI retrieval. No fluff.]""",
+    "landing": """[Write landing page copy with:
+- Hero headline (bold, benefit-driven)
+- Subheadline (1-2 sentences expanding on the value)
+- 3 feature bullets (short, punchy)
+- CTA text (action-oriented button text)]""",
+    "email": """[Write a single marketing email with:
+- Subject line (curiosity-driving, under 50 chars)
+- Preview text (complementary, under 90 chars)
+- Body (conversational, 150-200 words, clear CTA)]""",
+    "seo": """[Write SEO assets:
+- Meta title (under 60 chars, keyword-rich)
+- Meta description (under 155 chars, compelling)
+- 2-3 H1 alternatives (varied angles)]""",
+}
+
+# Shared by every format so it can sit in the cached prompt prefix; the
+# per-format instruction goes last (see section_instruction)
+SECTION_SYSTEM_PROMPT = """You are Content Fin, Intercom's AI copywriter.
+
+The user has pasted content. Transform it into the requested asset using Intercom's voice (confident, simple, futurist, punchy).
+
+IMPORTANT RULES:
+- NO hashtags ever
+- Be direct and confident
+- Short sentences
+- No fluff or filler words
+
+Write ONLY the requested asset. Do not add a heading, preamble or sign-off."""
+
+SECTION_INSTRUCTION = """Now write this asset:
+
+{instruction}"""
+
+RESPONSE_HEADER = "**Content Fin**\n\nHere are your drafts:"
+SECTION_SEPARATOR = "\n\n---\n\n"
+
+
+def section_instruction(content_type: str) -> str:
+    """
+    Builds the final user-turn instruction for a single output format.
+    """
+    return SECTION_INSTRUCTION.format(instruction=FORMAT_INSTRUCTIONS[content_type])
+
+
+def section_prompt_version(content_type: str) -> str:
+    """
+    Everything prompt-side that shapes one format's output; used in cache keys.
+    """
+    return SECTION_SYSTEM_PROMPT + "\n\n" + section_instruction(content_type)
+
+
+def compose_response(sections: dict, order: list) -> str:
+    """
+    Joins generated section bodies (keyed by content type) into the chat
+    response layout: header, then one headed block per format in `order`.
+    """
+    parts = [RESPONSE_HEADER]
+    for content_type in order:
+        if content_type in sections:
+            parts.append(f"{FORMAT_HEADINGS[content_type]}\n\n{sections[content_type].strip()}")
+    return SECTION_SEPARATOR.join(parts)
@@ -4,16 +4,30 @@
 # The main app.py uses its own inline chat-style generation.
 # =============================================================================
 
+import asyncio
 import json
 import os
+import time
+import weakref
 import anthropic
 import config
+from utils.clients import get_async_client, get_client
+from utils.cache import get_response_cache, make_key
+from utils.compress import compress, estimate_tokens
+from utils.jsonstream import ObjectStreamParser
+from utils.metrics import get_metrics, record
+from utils.ratelimit import BATCH, acall_with_retry, call_with_retry, estimate_request_tokens, get_rate_limiter, stream_with_retry
+from utils.usage import CACHE_CONTROL, format_usage, usage_dict
 
-def generate_campaign(text: str, api_key: str = None, demo_mode: bool = False) -> dict:
+CAMPAIGN_FORMATS = ["linkedin", "twitter", "tiktok", "fin"]
+PARSE_ERROR = "Error parsing generated content."
+
+def generate_campaign(text: str, api_key: str = None, demo_mode: bool = False, use_cache: bool = True) -> dict:
     """
     Generates the marketing campaign assets.
     If demo_mode is True, returns pre-canned data immediately.
-    Otherwise, calls Anthropic API.
+    Otherwise, returns a cached result for the same input/prompt/model, or
+    calls Anthropic API. Pass use_cache=False to force a fresh generation.
     """
     if demo_mode:
         return config.DEMO_RESPONSE
@@ -21,50 +35,461 @@ def generate_campaign(text: str, api_key: str = None, demo_mode: bool = False) -
     if not api_key:
         raise ValueError("API Key is required for non-demo mode.")
 
-    client = anthropic.Anthropic(api_key=api_key)
+    cache = get_response_cache()
+    cache_key = make_key(text, CAMPAIGN_FORMATS, config.SYSTEM_PROMPT, config.CHAT_MODEL)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+    result = _generate(text, api_key)
+    if result.get("linkedin") != PARSE_ERROR:  # Don't pin unusable output
+        cache.set(cache_key, json.dumps(result))
+    return result
+
+def _campaign_request(text: str) -> dict:
+    """
+    Builds the messages.create() parameters for one campaign, shared by the
+    synchronous and batch paths.
+    """
+    # Long sources are compressed to the input token budget
+    text, compression = compress(text)
+    if compression["tokens_saved"]:
+        print(f"[generator] Input compressed: {compression}")
+
+    return {
+        "model": config.CHAT_MODEL,
+        "max_tokens": 2000,
+        "temperature": 0.7,
+        "system": [{"type": "text", "text": config.SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}],
+        "messages": [
+            {
+                "role": "user",
+                "content": f"Here is the blog content to repurpose:\n\n{text}"
+            }
+        ]
+    }
+
+def _parse_campaign(content: str) -> dict:
+    # Robust JSON extraction
+    try:
+        # First try direct parsing
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # Fallback: Find first { and last }
+        start_idx = content.find('{')
+        end_idx = content.rfind('}') + 1
+        
+        if start_idx != -1 and end_idx != -1:
+            json_str = content[start_idx:end_idx]
+            return json.loads(json_str)
+        else:
+            # Last resort fallback if JSON is malformed
+            return {
+                "linkedin": PARSE_ERROR,
+                "twitter": PARSE_ERROR,
+                "tiktok": PARSE_ERROR,
+                "fin": content # Return full text so user sees something
+            }
+
+def _parse_recorded(content: str, output_tokens: int) -> dict:
+    # _parse_campaign, counting unusable responses and their wasted tokens
+    record("campaigns")
+    try:
+        result = _parse_campaign(content)
+    except json.JSONDecodeError:
+        _record_parse_failure(output_tokens)
+        raise
+    if PARSE_ERROR in result.values():
+        _record_parse_failure(output_tokens)
+    return result
+
+def _record_parse_failure(wasted_tokens: int):
+    record("parse_failures")
+    record("wasted_output_tokens", wasted_tokens)
+
+def _create_message(client, request: dict):
+    # Programmatic callers queue behind interactive chat
+    raw = call_with_retry(lambda: client.messages.with_raw_response.create(**request),
+                          priority=BATCH, tokens=estimate_request_tokens(request))
+    get_rate_limiter().update(raw.headers)
+    message = raw.parse()
+    print(f"[generator] Token usage: {format_usage(usage_dict(message.usage))}")
+    return message
+
+def _generate(text: str, api_key: str) -> dict:
+    client = get_client(api_key)
 
     try:
         # Using Claude 3.5 Sonnet (latest available via API)
-        message = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2000,
-            temperature=0.7,
-            system=config.SYSTEM_PROMPT,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"Here is the blog content to repurpose:\n\n{text}"
-                }
-            ]
-        )
+        message = _create_message(client, _campaign_request(text))
 
         # Extract JSON from the response
-        content = message.content[0].text
-        
-        # Robust JSON extraction
+        return _parse_recorded(message.content[0].text, message.usage.output_tokens)
+
+    except Exception as e:
+        raise _generation_error(e)
+
+def _generation_error(e: Exception) -> Exception:
+    if isinstance(e, anthropic.APIConnectionError):
+        return Exception("Connection error. Please check your internet connection.")
+    if isinstance(e, anthropic.AuthenticationError):
+        return Exception("Authentication failed. Please check your API Key.")
+    return Exception(f"Generation failed: {str(e)}")
+
+# =============================================================================
+# Streaming Mode
+# stream_campaign yields each asset as soon as its JSON value has closed,
+# instead of waiting for the whole response. If the streamed JSON turns out
+# to be malformed, the usual fallback parse runs on the full text and any
+# assets not yet yielded follow.
+# =============================================================================
+
+def stream_campaign(text: str, api_key: str = None, demo_mode: bool = False, use_cache: bool = True):
+    """
+    Streaming variant of generate_campaign. Yields (format, content) pairs
+    in the order the model closes them.
+    """
+    if demo_mode:
+        yield from config.DEMO_RESPONSE.items()
+        return
+
+    if not api_key:
+        raise ValueError("API Key is required for non-demo mode.")
+
+    cache = get_response_cache()
+    cache_key = make_key(text, CAMPAIGN_FORMATS, config.SYSTEM_PROMPT, config.CHAT_MODEL)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield from json.loads(cached).items()
+            return
+
+    client = get_client(api_key)
+    parser = ObjectStreamParser()
+    result, parts = {}, []
+    try:
+        with stream_with_retry(client, BATCH, **_campaign_request(text)) as stream:
+            for delta in stream.text_stream:
+                parts.append(delta)
+                if parser.done:
+                    continue
+                try:
+                    pairs = parser.feed(delta)
+                except json.JSONDecodeError:
+                    parser.done = True  # Stop incremental parsing; fall back below
+                    continue
+                for key, value in pairs:
+                    result[key] = value
+                    yield key, value
+            usage = usage_dict(stream.get_final_message().usage)
+            print(f"[generator] Token usage: {format_usage(usage)}")
+    except Exception as e:
+        raise _generation_error(e)
+
+    record("campaigns")
+
+    if not all(key in result for key in CAMPAIGN_FORMATS):
+        content = "".join(parts)
         try:
-            # First try direct parsing
-            return json.loads(content)
+            fallback = _parse_campaign(content)
         except json.JSONDecodeError:
-            # Fallback: Find first { and last }
-            start_idx = content.find('{')
-            end_idx = content.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = content[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                # Last resort fallback if JSON is malformed
-                return {
-                    "linkedin": "Error parsing generated content.",
-                    "twitter": "Error parsing generated content.", 
-                    "tiktok": "Error parsing generated content.",
-                    "fin": content # Return full text so user sees something
-                }
-
-    except anthropic.APIConnectionError as e:
-        raise Exception("Connection error. Please check your internet connection.")
-    except anthropic.AuthenticationError as e:
-        raise Exception("Authentication failed. Please check your API Key.")
+            fallback = {"linkedin": PARSE_ERROR, "twitter": PARSE_ERROR, "tiktok": PARSE_ERROR, "fin": content}
+        if PARSE_ERROR in fallback.values():
+            _record_parse_failure(usage["output_tokens"])
+        for key, value in fallback.items():
+            if key not in result:
+                result[key] = value
+                yield key, value
+
+    if PARSE_ERROR not in result.values():  # Don't pin unusable output
+        cache.set(cache_key, json.dumps(result))
+
+# =============================================================================
+# Structured Mode
+# generate_campaign_structured forces the four-asset schema through tool use,
+# so the answer arrives as tool input rather than free text to be repaired.
+# Each field is validated; only the fields that fail are re-asked, one at a
+# time via the save_asset tool, instead of regenerating the whole campaign.
+# If no field is usable at all, save_campaign is retried once instead.
+# Both tools are sent on every call so the cached prefix stays identical.
+# =============================================================================
+
+FIELD_DESCRIPTIONS = {
+    "linkedin": "The LinkedIn post.",
+    "twitter": "The 5-tweet Twitter thread.",
+    "tiktok": "The TikTok/Reels script, with [Visual Cues].",
+    "fin": "The factual, RAG-ready Fin answer.",
+}
+
+CAMPAIGN_TOOLS = [
+    {
+        "name": "save_campaign",
+        "description": "Save all four campaign assets.",
+        "input_schema": {
+            "type": "object",
+            "properties": {key: {"type": "string", "description": FIELD_DESCRIPTIONS[key]} for key in CAMPAIGN_FORMATS},
+            "required": CAMPAIGN_FORMATS,
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "save_asset",
+        "description": "Save a single campaign asset.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "format": {"type": "string", "enum": CAMPAIGN_FORMATS},
+                "content": {"type": "string"},
+            },
+            "required": ["format", "content"],
+            "additionalProperties": False,
+        },
+    },
+]
+
+def generate_campaign_structured(text: str, api_key: str = None, demo_mode: bool = False, use_cache: bool = True) -> dict:
+    """
+    Same result shape as generate_campaign, produced via forced tool use.
+    Fields still invalid after STRUCTURED_MAX_REPAIRS re-asks (or every
+    field, if a retried save_campaign still returns nothing usable) come
+    back as PARSE_ERROR and the result is not cached.
+    """
+    if demo_mode:
+        return config.DEMO_RESPONSE
+
+    if not api_key:
+        raise ValueError("API Key is required for non-demo mode.")
+
+    cache = get_response_cache()
+    cache_key = make_key(text, CAMPAIGN_FORMATS, config.SYSTEM_PROMPT + json.dumps(CAMPAIGN_TOOLS), config.CHAT_MODEL)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+    client = get_client(api_key)
+    try:
+        message, data, result = _save_campaign(client, text)
+        record("campaigns")
+        if len(result) < len(CAMPAIGN_FORMATS):
+            # At most one parse failure per campaign, however many calls the
+            # recovery below takes; retries and repairs have their own counters
+            record("parse_failures")
+        if not result:
+            # Nothing usable (no save_campaign call, or every field invalid):
+            # one more full attempt costs one call instead of one per field
+            print("[generator] No valid fields, retrying save_campaign once")
+            record("wasted_output_tokens", message.usage.output_tokens)
+            record("campaign_retries")
+            message, data, result = _save_campaign(client, text)
+            if not result:
+                record("wasted_output_tokens", message.usage.output_tokens)
+                result = {key: PARSE_ERROR for key in CAMPAIGN_FORMATS}
+
+        failed = [key for key in CAMPAIGN_FORMATS if key not in result]
+        if failed:
+            print(f"[generator] Invalid fields {failed}, re-asking only those")
+            record("wasted_output_tokens", sum(estimate_tokens(json.dumps(data[key])) for key in failed if key in data))
+            for key in failed:
+                result[key] = _repair_field(client, text, key)
     except Exception as e:
-        raise Exception(f"Generation failed: {str(e)}")
+        raise _generation_error(e)
+
+    result = {key: result[key] for key in CAMPAIGN_FORMATS}
+    if PARSE_ERROR not in result.values():  # Don't pin unusable output
+        cache.set(cache_key, json.dumps(result))
+    print(f"[generator] Metrics: {get_metrics()}")
+    return result
+
+def _structured_request(text: str, tool_name: str, instruction: str = None) -> dict:
+    request = _campaign_request(text)
+    request["tools"] = CAMPAIGN_TOOLS
+    request["tool_choice"] = {"type": "tool", "name": tool_name}
+    if instruction:
+        request["messages"][0]["content"] += f"\n\n{instruction}"
+    return request
+
+def _save_campaign(client, text: str) -> tuple:
+    # One save_campaign call: (message, tool input, its valid fields)
+    message = _create_message(client, _structured_request(text, "save_campaign"))
+    data = _tool_input(message, "save_campaign")
+    return message, data, {key: data[key] for key in CAMPAIGN_FORMATS if _valid_field(data.get(key))}
+
+def _repair_field(client, text: str, key: str) -> str:
+    instruction = (f'Only the "{key}" asset is needed this time ({FIELD_DESCRIPTIONS[key]}). '
+                   f'Call save_asset with format "{key}".')
+    for _ in range(config.STRUCTURED_MAX_REPAIRS):
+        record("field_repairs")
+        message = _create_message(client, _structured_request(text, "save_asset", instruction))
+        data = _tool_input(message, "save_asset")
+        if data.get("format") == key and _valid_field(data.get("content")):
+            return data["content"]
+        record("wasted_output_tokens", message.usage.output_tokens)
+    return PARSE_ERROR
+
+def _tool_input(message, tool_name: str) -> dict:
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == tool_name:
+            return block.input if isinstance(block.input, dict) else {}
+    return {}
+
+def _valid_field(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+# =============================================================================
+# Async Mode
+# agenerate_campaign mirrors generate_campaign for asyncio callers. All calls
+# share one pooled AsyncAnthropic client per event loop, and a per-loop
+# semaphore caps in-flight requests so hundreds of campaigns can be gathered
+# at once.
+# =============================================================================
+
+_async_limits = weakref.WeakKeyDictionary()
+
+def _async_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_limits:
+        _async_limits[loop] = asyncio.Semaphore(config.ASYNC_MAX_CONCURRENCY)
+    return _async_limits[loop]
+
+async def agenerate_campaign(text: str, api_key: str = None, demo_mode: bool = False, use_cache: bool = True,
+                             semaphore: asyncio.Semaphore = None) -> dict:
+    """
+    Async variant of generate_campaign. Concurrency is limited by
+    `semaphore`, or by a shared per-loop limit of ASYNC_MAX_CONCURRENCY.
+    """
+    if demo_mode:
+        return config.DEMO_RESPONSE
+
+    if not api_key:
+        raise ValueError("API Key is required for non-demo mode.")
+
+    cache = get_response_cache()
+    cache_key = make_key(text, CAMPAIGN_FORMATS, config.SYSTEM_PROMPT, config.CHAT_MODEL)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+    client = get_async_client(api_key)
+    request = _campaign_request(text)
+    try:
+        async with semaphore or _async_limit():
+            raw = await acall_with_retry(lambda: client.messages.with_raw_response.create(**request),
+                                         priority=BATCH, tokens=estimate_request_tokens(request))
+        get_rate_limiter().update(raw.headers)
+        message = await raw.parse()
+        print(f"[generator] Token usage: {format_usage(usage_dict(message.usage))}")
+        result = _parse_recorded(message.content[0].text, message.usage.output_tokens)
+    except Exception as e:
+        raise _generation_error(e)
+
+    if result.get("linkedin") != PARSE_ERROR:  # Don't pin unusable output
+        cache.set(cache_key, json.dumps(result))
+    return result
+
+# =============================================================================
+# Batch Mode
+# Submits many campaigns as one Message Batch (asynchronous, billed at the
+# batch discount). Progress is saved to a JSON state file so a crashed run
+# can be restarted with the same inputs and pick up the existing batch.
+# =============================================================================
+
+def generate_campaigns_batch(texts: list, api_key: str = None, client=None, state_path: str = None,
+                             poll_interval: float = 5, max_poll_interval: float = 60,
+                             use_cache: bool = True) -> list:
+    """
+    Generates campaigns for many texts with the Message Batches API.
+    Returns one dict per input, in input order. Inputs the batch couldn't
+    process come back as {"error": "..."}.
+    `client` can be any object exposing messages.batches (e.g. a client
+    pointed at a local fake via base_url); otherwise one is built from api_key.
+    """
+    if client is None:
+        if not api_key:
+            raise ValueError("API Key is required for batch mode.")
+        client = get_client(api_key)
+
+    cache = get_response_cache()
+    state_path = state_path or os.path.join(config.CACHE_DIR, "campaign_batch.json")
+    cache_keys = [make_key(text, CAMPAIGN_FORMATS, config.SYSTEM_PROMPT, config.CHAT_MODEL) for text in texts]
+    custom_ids = [f"post-{i}-{key[:16]}" for i, key in enumerate(cache_keys)]
+
+    # Resume only if the saved state belongs to exactly these inputs
+    state = _load_batch_state(state_path)
+    if state.get("custom_ids") != custom_ids:
+        state = {"custom_ids": custom_ids, "batch_id": None, "results": {}}
+
+    results = state["results"]
+    if use_cache and not state["batch_id"]:
+        for custom_id, key in zip(custom_ids, cache_keys):
+            cached = cache.get(key)
+            if cached is not None:
+                results[custom_id] = json.loads(cached)
+
+    pending = [(custom_id, text) for custom_id, text in zip(custom_ids, texts) if custom_id not in results]
+    if pending and not state["batch_id"]:
+        requests = [{"custom_id": custom_id, "params": _campaign_request(text)} for custom_id, text in pending]
+        batch = call_with_retry(lambda: client.messages.batches.create(requests=requests), priority=BATCH)
+        state["batch_id"] = batch.id
+        _save_batch_state(state_path, state)
+        print(f"[generator] Submitted batch {batch.id} with {len(pending)} requests")
+
+    if pending:
+        _wait_for_batch(client, state["batch_id"], poll_interval, max_poll_interval)
+        try:
+            for entry in client.messages.batches.results(state["batch_id"]):
+                if entry.custom_id not in custom_ids:
+                    continue
+                results[entry.custom_id] = _batch_result(entry, cache, cache_keys[custom_ids.index(entry.custom_id)])
+        finally:
+            # Keep whatever was collected if reading the results fails part-way
+            _save_batch_state(state_path, state)
+
+    # Everything is mapped back; the state file is no longer needed
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return [results.get(custom_id, {"error": "missing from batch results"}) for custom_id in custom_ids]
+
+def _batch_result(entry, cache, cache_key: str) -> dict:
+    # One batch entry as a campaign dict, or {"error": ...}
+    if entry.result.type != "succeeded":
+        error = getattr(entry.result, "error", None)
+        return {"error": f"{entry.result.type}: {error}" if error else entry.result.type}
+    message = entry.result.message
+    try:
+        result = _parse_recorded(message.content[0].text, message.usage.output_tokens)
+    except json.JSONDecodeError:
+        print(f"[generator] Unparseable output for {entry.custom_id}")
+        return {"error": "unparseable output"}
+    if result.get("linkedin") != PARSE_ERROR:
+        cache.set(cache_key, json.dumps(result))
+    return result
+
+def _wait_for_batch(client, batch_id: str, poll_interval: float, max_poll_interval: float):
+    # Poll with exponential backoff until the batch has ended
+    delay = poll_interval
+    while True:
+        batch = call_with_retry(lambda: client.messages.batches.retrieve(batch_id), priority=BATCH)
+        if batch.processing_status == "ended":
+            return batch
+        print(f"[generator] Batch {batch_id} {batch.processing_status}: {batch.request_counts}")
+        time.sleep(delay)
+        delay = min(delay * 1.5, max_poll_interval)
+
+def _load_batch_state(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_batch_state(path: str, state: dict):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a crash never leaves a half-written state file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
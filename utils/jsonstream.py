@@ -0,0 +1,101 @@
+# =============================================================================
+# Streaming JSON
+# Incrementally parses a single top-level JSON object as text arrives and
+# hands back each key/value pair as soon as the value closes, so callers can
+# use the first fields before the rest of the response has been generated.
+# Anything before the opening "{" (e.g. a ```json fence) is skipped.
+# Unbalanced brackets raise json.JSONDecodeError, like any malformed value.
+# =============================================================================
+
+import json
+
+_WHITESPACE = " \t\r\n"
+_OPENERS = {"]": "[", "}": "{"}
+
+
+class ObjectStreamParser:
+    """
+    Feed text chunks with feed(); each call returns the (key, value) pairs
+    completed by that chunk. `done` is True once the closing "}" is seen.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._state = "start"  # start, before_key, key, colon, value
+        self._buffer = []  # Characters of the key or value being read
+        self._key = None
+        self._open = []  # Brackets opened inside the current value
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list:
+        pairs = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._state == "value":
+                if self._read_value(char):
+                    pairs.append(self._close_value())
+                    if char == "}":
+                        self.done = True
+                continue
+            if self._state == "key":
+                self._read_key(char)
+            elif char in _WHITESPACE:
+                continue
+            elif self._state == "start":
+                if char == "{":
+                    self._state = "before_key"
+            elif self._state == "before_key":
+                if char == '"':
+                    self._state = "key"
+                elif char == "}":
+                    self.done = True
+            elif self._state == "colon":
+                if char == ":":
+                    self._state = "value"
+                    self._buffer = []
+        return pairs
+
+    def _read_key(self, char: str):
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            self._key = json.loads('"' + "".join(self._buffer) + '"')
+            self._buffer = []
+            self._state = "colon"
+            return
+        self._buffer.append(char)
+
+    def _read_value(self, char: str) -> bool:
+        # Returns True when `char` ends the value (a top-level "," or "}")
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+        elif char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._open.append(char)
+        elif char in "]}":
+            if not self._open and char == "}":
+                return True
+            if not self._open or self._open.pop() != _OPENERS[char]:
+                raise json.JSONDecodeError(f"Unbalanced {char!r}", "".join(self._buffer) + char, len(self._buffer))
+        elif char == "," and not self._open:
+            return True
+        self._buffer.append(char)
+        return False
+
+    def _close_value(self):
+        value = json.loads("".join(self._buffer))
+        pair = (self._key, value)
+        self._buffer = []
+        self._key = None
+        self._state = "before_key"
+        return pair
@@ -0,0 +1,34 @@
+# =============================================================================
+# Generation Metrics
+# Process-wide counters for generation quality: how many campaigns came
+# back unusable the first time (at most one parse failure each), how many
+# campaigns and fields had to be re-asked, and how many output tokens were
+# paid for and then thrown away.
+# =============================================================================
+
+import threading
+
+_counters = {}
+_lock = threading.Lock()
+
+
+def record(name: str, amount: int = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def get_metrics() -> dict:
+    """
+    Returns a snapshot of the counters plus the derived parse-failure rate:
+    the share of campaigns whose first response wasn't fully usable.
+    """
+    with _lock:
+        metrics = dict(_counters)
+    campaigns = metrics.get("campaigns", 0)
+    metrics["parse_failure_rate"] = metrics.get("parse_failures", 0) / campaigns if campaigns else 0.0
+    return metrics
+
+
+def reset_metrics():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,100 @@
+# =============================================================================
+# Speculative Prefetch
+# Starts fetching and extracting a URL as soon as it appears in the chat
+# input (on the rerun triggered by e.g. picking formats), so pressing Send
+# finds the article ready instead of waiting on the network. Optionally the
+# prompt cache is warmed with the article too. Jobs run on a small
+# background pool shared by all sessions; results expire after
+# PREFETCH_TTL seconds.
+# =============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.clients import get_client
+from utils.compress import compress
+from utils.fanout import warm_prompt_cache
+from utils.scraper import scrape_article
+
+
+def find_url(text: str):
+    """
+    Returns the URL if the input is a bare URL (the same rule app.py uses
+    when the message is sent), else None.
+    """
+    text = (text or "").strip()
+    if text.startswith("http") and not any(c.isspace() for c in text):
+        return text
+    return None
+
+
+class Prefetcher:
+    def __init__(self, max_workers: int = None, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or config.PREFETCH_MAX_ENTRIES
+        self.ttl = ttl or config.PREFETCH_TTL
+        self._jobs = OrderedDict()  # url -> (started_at, future)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or config.PREFETCH_WORKERS,
+                                            thread_name_prefix="prefetch")
+
+    def prefetch(self, url: str, api_key: str = None, content_type: str = None):
+        """
+        Starts fetching `url` unless a fresh job for it already exists.
+        With an api_key, the article's prompt prefix is also written to the
+        prompt cache (for `content_type`'s section request).
+        """
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(url)
+            if job and now - job[0] < self.ttl:
+                return
+            print(f"[prefetch] Fetching {url}")
+            self._jobs[url] = (now, self._executor.submit(self._run, url, api_key, content_type))
+            self._jobs.move_to_end(url)
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+
+    def article(self, url: str):
+        """
+        Returns the prefetched Article for `url`, waiting for a job still in
+        flight, or None if there is no fresh job (or it failed).
+        """
+        with self._lock:
+            job = self._jobs.get(url)
+        if not job or time.time() - job[0] >= self.ttl:
+            return None
+        try:
+            return job[1].result()
+        except Exception as e:
+            print(f"[prefetch] {url} failed: {e}")
+            return None
+
+    def _run(self, url: str, api_key: str, content_type: str):
+        article = scrape_article(url)
+        if article and article.text and api_key:
+            # Same compression app.py applies before generating, so the
+            # warmed prefix matches the real requests
+            source_text, _ = compress(article.body)
+            try:
+                warm_prompt_cache(get_client(api_key), source_text, content_type or "linkedin")
+            except Exception as e:
+                print(f"[prefetch] Cache warm for {url} failed: {e}")
+        return article
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """
+    Returns the process-wide prefetcher, creating it on first use.
+    """
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
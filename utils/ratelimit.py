@@ -0,0 +1,263 @@
+# =============================================================================
+# Rate Limiting and Retries
+# A process-wide limiter shared by every Anthropic call. Two token buckets
+# (requests/min and input tokens/min) start from config defaults and are
+# corrected from the anthropic-ratelimit-* response headers. Waiters are
+# served strictly by priority, so interactive chat goes ahead of batch jobs.
+# 429/overloaded/5xx responses and connection errors are retried with
+# jittered exponential backoff, honouring retry-after when present.
+# =============================================================================
+
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import anthropic
+
+import config
+
+INTERACTIVE = 0
+BATCH = 1
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504, 529)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # A request bigger than the whole bucket only waits for a full one
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed * 60 / self.capacity) if self.capacity else 0.0
+
+
+class RateLimiter:
+    """
+    Blocks callers until both buckets have room, highest priority (lowest
+    number) first, then first come first served.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests = TokenBucket(requests_per_minute or config.RATE_LIMIT_RPM)
+        self.tokens = TokenBucket(tokens_per_minute or config.RATE_LIMIT_ITPM)
+        self._paused_until = 0.0
+        self._waiters = []
+        self._async_waiters = {}  # ticket -> (loop, asyncio.Event) for acquire_async
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int = 0, priority: int = INTERACTIVE):
+        ticket = (priority, next(self._order))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = self._take(ticket, tokens)
+                    if wait == 0:
+                        return
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._release(ticket)
+
+    async def acquire_async(self, tokens: int = 0, priority: int = INTERACTIVE):
+        """
+        acquire() for coroutines: waits on an event instead of a thread, in
+        the same queue as blocking callers. A cancelled waiter leaves the
+        queue without taking capacity.
+        """
+        ticket = (priority, next(self._order))
+        wake = asyncio.Event()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            self._async_waiters[ticket] = (asyncio.get_running_loop(), wake)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._take(ticket, tokens)
+                    if wait == 0:
+                        return
+                    wake.clear()
+                try:
+                    await asyncio.wait_for(wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                del self._async_waiters[ticket]
+                self._release(ticket)
+
+    def _take(self, ticket: tuple, tokens: int):
+        # Called holding self._cond. Takes capacity and returns 0 if `ticket`
+        # is first in the queue and both buckets have room; otherwise returns
+        # seconds to wait, or None to wait until the head of the queue moves.
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        if self._waiters[0] != ticket:
+            return None
+        wait = max(self._paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        self.requests.level -= 1
+        self.tokens.level -= min(tokens, self.tokens.capacity)
+        return 0
+
+    def _release(self, ticket: tuple):
+        # Called holding self._cond
+        self._waiters.remove(ticket)
+        heapq.heapify(self._waiters)
+        self._notify()
+
+    def _notify(self):
+        # Wakes every waiter, blocking and async, to re-check the queue
+        self._cond.notify_all()
+        for loop, wake in self._async_waiters.values():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Loop already closed; its waiter is gone with it
+
+    def update(self, headers):
+        """
+        Syncs the buckets with the server's view from response headers.
+        """
+        if not headers:
+            return
+        with self._cond:
+            for bucket, name in ((self.requests, "requests"), (self.tokens, "input-tokens")):
+                limit = _header_number(headers, f"anthropic-ratelimit-{name}-limit")
+                remaining = _header_number(headers, f"anthropic-ratelimit-{name}-remaining")
+                if limit:
+                    bucket.capacity = limit
+                if remaining is not None:
+                    bucket.level = min(bucket.level, remaining)
+            self._notify()
+
+    def pause(self, seconds: float):
+        """
+        Holds every caller for `seconds`, e.g. after a 429.
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._notify()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide rate limiter, creating it on first use.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """
+    Rough input-token estimate for a messages request (about 4 chars/token).
+    """
+    size = len(json.dumps(request.get("system", ""), ensure_ascii=False))
+    size += len(json.dumps(request.get("messages", []), ensure_ascii=False))
+    return size // 4
+
+
+def call_with_retry(fn, priority: int = INTERACTIVE, tokens: int = 0, max_attempts: int = None):
+    """
+    Calls fn() once the limiter admits it, retrying retryable failures with
+    jittered exponential backoff.
+    """
+    limiter = get_rate_limiter()
+    max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+    for attempt in range(max_attempts):
+        limiter.acquire(tokens, priority)
+        try:
+            return fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, limiter)
+            if delay is None or attempt == max_attempts - 1:
+                raise
+            print(f"[ratelimit] {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+
+
+async def acall_with_retry(fn, priority: int = BATCH, tokens: int = 0, max_attempts: int = None):
+    """
+    Async variant of call_with_retry; fn is a coroutine function.
+    """
+    limiter = get_rate_limiter()
+    max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+    for attempt in range(max_attempts):
+        await limiter.acquire_async(tokens, priority)
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, limiter)
+            if delay is None or attempt == max_attempts - 1:
+                raise
+            print(f"[ratelimit] {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+
+@contextmanager
+def stream_with_retry(client, priority: int = INTERACTIVE, **request):
+    """
+    Like client.messages.stream(**request), but opening the stream goes
+    through the limiter and is retried. Failures after text has started
+    flowing are not retried, since the caller may have shown it already.
+    """
+    manager = None
+
+    def start():
+        nonlocal manager
+        manager = client.messages.stream(**request)
+        return manager.__enter__()
+
+    stream = call_with_retry(start, priority=priority, tokens=estimate_request_tokens(request))
+    get_rate_limiter().update(getattr(stream.response, "headers", None))
+    try:
+        yield stream
+    finally:
+        manager.__exit__(None, None, None)
+
+
+def _retry_delay(e: Exception, attempt: int, limiter: RateLimiter):
+    # Returns seconds to wait before retrying, or None if e isn't retryable
+    if isinstance(e, anthropic.APIStatusError):
+        if e.status_code not in RETRYABLE_STATUS:
+            return None
+        headers = getattr(e.response, "headers", None)
+        limiter.update(headers)
+        retry_after = _header_number(headers, "retry-after") if headers else None
+        if retry_after is not None:
+            if e.status_code == 429:
+                limiter.pause(retry_after)
+            return retry_after + random.uniform(0, 1)
+    elif not isinstance(e, anthropic.APIConnectionError):
+        return None
+    # Full jitter: uniform in [0, base * 2^attempt], capped
+    return random.uniform(0, min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _header_number(headers, name: str):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
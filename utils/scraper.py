@@ -1,46 +1,325 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.cache import get_fetch_cache
+from utils.extractor import find_main_content
 
-def scrape_blog_post(url: str) -> str:
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode 'br' responses
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+# HTML parser backend. html.parser is the default because it keeps text that
+# lxml drops or moves when repairing malformed markup (see
+# tests/test_parser_parity.py). lxml is several times faster but an optional
+# install; opt in with SCRAPER_PARSER=lxml once bench_scraper.py shows no
+# quality loss on your pages.
+DEFAULT_PARSER = 'html.parser'
+PARSER = os.environ.get('SCRAPER_PARSER', DEFAULT_PARSER)
+
+# Download and extraction budgets
+MAX_BYTES = 2 * 1024 * 1024  # Stop downloading after 2 MB of HTML
+MAX_CHARS = 15000            # Extracted text sent on to generation
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_TAGS = ('p', 'h1', 'h2', 'h3', 'li')
+HEADING_TAGS = ('h1', 'h2', 'h3')
+
+# Connection pooling: one pool per host, kept alive across scrapes
+POOL_HOSTS = 16     # Distinct hosts kept in the pool
+POOL_SIZE = 8       # Connections kept per host
+RETRIES = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=('GET', 'HEAD'),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
     """
-    Scrapes the text content from a given blog post URL.
-    Attempts to be generic but works best with standard HTML article tags.
+    Returns the shared scraper session, creating it on first use.
+    Reusing it keeps TCP/TLS connections alive between requests to the
+    same host and retries 429/5xx responses with exponential backoff.
     """
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Attempt to find the main article content
-        # Common selectors for blog posts
-        article = soup.find('article')
-        if not article:
-            article = soup.find('main')
-        if not article:
-            article = soup.find('div', class_='post-content') # Generic fallback
-        
-        # If still nothing, fall back to body but remove script/style
-        if not article:
-            article = soup.body
-
-        # Remove scripts, styles, navs, footers from the found element
-        for element in article(['script', 'style', 'nav', 'footer', 'header', 'iframe', 'aside']):
-            element.decompose()
-
-        # Extract text
-        text = ' '.join(p.get_text().strip() for p in article.find_all(['p', 'h1', 'h2', 'h3', 'li']))
-        
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=RETRIES)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def fetch_html(url: str, cache=None, gate=None) -> bytes:
+    """
+    Fetches the raw HTML for a URL through the on-disk fetch cache.
+    Fresh cache entries are returned without touching the network; stale
+    ones are revalidated with If-None-Match / If-Modified-Since.
+    Pass cache=False to bypass caching entirely. `gate(url)` is an optional
+    context manager held around the network request (see HostGate).
+    """
+    if cache is None:
+        cache = get_fetch_cache()
+
+    headers = {}
+    entry = cache.get(url) if cache else None
+    if entry:
+        if entry['fresh']:
+            return entry['body']
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    with gate(url) if gate else nullcontext():
+        with get_session().get(url, headers=headers, timeout=10, stream=True) as response:
+            if entry and response.status_code == 304:
+                cache.revalidated(url)
+                return entry['body']
+            response.raise_for_status()
+            body = _read_html(response)
+
+    if cache:
+        cache.put(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return body
+
+def _read_html(response) -> bytes:
+    """
+    Reads a streamed response body, refusing non-HTML content types and
+    stopping at MAX_BYTES so oversized pages are never held in full.
+    """
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise ValueError(f"Not an HTML page ({content_type})")
+
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= MAX_BYTES:
+            break
+    return b''.join(chunks)[:MAX_BYTES]
+
+@dataclass(slots=True)
+class Section:
+    """
+    A run of text under one heading. level is 1-3 for h1-h3, 0 for text
+    before the first heading.
+    """
+    level: int
+    heading: str = None
+    parts: list = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return ' '.join(([self.heading] if self.heading else []) + self.parts)
+
+@dataclass(slots=True)
+class Article:
+    """
+    Structured scrape result: page metadata plus the article body as ordered
+    sections. `text` is the flattened body within the MAX_CHARS budget;
+    `body` is the same text with one paragraph per section, for generation
+    (compression keeps paragraph structure and leads).
+    """
+    url: str = None
+    canonical_url: str = None
+    title: str = None
+    published: str = None
+    sections: list = field(default_factory=list)
+    word_count: int = 0
+
+    @property
+    def text(self) -> str:
+        return ' '.join(section.text for section in self.sections if section.text)[:MAX_CHARS]
+
+    @property
+    def body(self) -> str:
+        return '\n\n'.join(section.text for section in self.sections if section.text)[:MAX_CHARS]
+
+def extract_article(html: bytes, url: str = None, parser: str = None) -> Article:
+    """
+    Extracts metadata and the sectioned article body from raw HTML.
+    `parser` is any BeautifulSoup tree builder ('lxml', 'html.parser');
+    defaults to PARSER.
+    """
+    soup = BeautifulSoup(html, parser or PARSER)
+    article = Article(url=url, **_extract_metadata(soup, url))
+
+    # Score the page for its main content block(s) rather than trusting
+    # <article>/<main>; boilerplate and link-heavy blocks are pruned
+    nodes = find_main_content(soup)
+
+    # Extract text, walking the tree lazily and stopping once the character
+    # budget is met (first 15k chars to avoid massive context)
+    section = Section(level=0)
+    article.sections.append(section)
+    length = 0
+    emitted = set()
+    for element in (el for node in nodes for el in node.descendants):
+        if element.name not in TEXT_TAGS:
+            continue
+        # A <p> inside an <li> was already emitted with its parent's text
+        if any(id(parent) in emitted for parent in element.parents):
+            continue
+        emitted.add(id(element))
         # Clean up whitespace
-        text = ' '.join(text.split())
-        
-        return text[:15000] # Return first 15k chars to avoid massive context
-        
+        piece = ' '.join(element.get_text().split())
+        if not piece:
+            continue
+        if element.name in HEADING_TAGS:
+            section = Section(level=HEADING_TAGS.index(element.name) + 1, heading=piece)
+            article.sections.append(section)
+        else:
+            section.parts.append(piece)
+        length += len(piece) + 1
+        if length > MAX_CHARS:
+            break
+
+    if not article.sections[0].parts:
+        article.sections.pop(0)
+    if not article.title:
+        article.title = next((s.heading for s in article.sections if s.level == 1), None)
+    article.word_count = len(article.text.split())
+    return article
+
+def extract_text(html: bytes, parser: str = None) -> str:
+    """
+    Extracts the article text from raw HTML as one flattened string.
+    """
+    return extract_article(html, parser=parser).text
+
+def _extract_metadata(soup, url: str = None) -> dict:
+    def meta(*names):
+        for name in names:
+            tag = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+            if tag and tag.get('content'):
+                return tag['content'].strip()
+        return None
+
+    canonical = soup.find('link', rel='canonical')
+    canonical_url = canonical.get('href') if canonical else None
+    canonical_url = urljoin(url or '', canonical_url or meta('og:url') or '') or url
+
+    title = meta('og:title', 'twitter:title')
+    if not title and soup.title and soup.title.string:
+        title = soup.title.string.strip()
+
+    published = meta('article:published_time', 'datePublished', 'pubdate', 'date')
+    if not published:
+        time_tag = soup.find('time', datetime=True)
+        published = time_tag['datetime'] if time_tag else None
+
+    return {'canonical_url': canonical_url, 'title': title, 'published': published}
+
+def scrape_article(url: str, cache=None) -> Article:
+    """
+    Scrapes a blog post into a structured Article (title, canonical URL,
+    published date, sections). Returns None if the page can't be scraped.
+    """
+    try:
+        return extract_article(fetch_html(url, cache=cache), url=url)
     except Exception as e:
         print(f"Error scraping {url}: {e}")
         return None
 
+def scrape_blog_post(url: str, cache=None) -> str:
+    """
+    Scrapes the text content from a given blog post URL.
+    The article body is located by content scoring (utils/extractor.py).
+    """
+    article = scrape_article(url, cache=cache)
+    return article.text if article else None
+
+@dataclass
+class ScrapeReport:
+    """
+    Outcome of one URL in scrape_many: the Article on success, otherwise the
+    failure reason, plus wall time spent on the URL.
+    """
+    url: str
+    article: Article = None
+    error: str = None
+    seconds: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return self.article.text if self.article else None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class HostGate:
+    """
+    Limits concurrent requests per host and spaces out request starts to
+    the same host by at least `delay` seconds.
+    """
+
+    def __init__(self, per_host: int = 2, delay: float = 0.5):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    @contextmanager
+    def __call__(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slots = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with slots:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+def scrape_many(urls, max_workers: int = 8, per_host: int = 2, delay: float = 0.5, cache=None):
+    """
+    Scrapes many URLs concurrently and yields a ScrapeReport for each as it
+    completes. At most `max_workers` URLs are in flight overall and
+    `per_host` per domain, with `delay` seconds between request starts to
+    the same domain. Cache hits skip the host gate entirely.
+    """
+    gate = HostGate(per_host=per_host, delay=delay)
 
+    def run(url):
+        started = time.monotonic()
+        try:
+            article = extract_article(fetch_html(url, cache=cache, gate=gate), url=url)
+            return ScrapeReport(url, article=article, seconds=time.monotonic() - started)
+        except Exception as e:
+            return ScrapeReport(url, error=f"{type(e).__name__}: {e}", seconds=time.monotonic() - started)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+    try:
+        futures = [executor.submit(run, url) for url in urls]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # If the caller stops early, don't wait for (or start) the rest
+        executor.shutdown(wait=False, cancel_futures=True)
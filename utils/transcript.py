@@ -0,0 +1,82 @@
+# =============================================================================
+# Chat Transcript
+# Keeps only a window of recent chat messages in session memory. Older
+# messages are spilled to the draft store and read back only when the user
+# asks to see them, so a rerun renders (and holds) a bounded number of
+# messages however long the session gets. Every message carries a "seq"
+# that never changes, for stable widget keys.
+# The transcript also carries the conversation state used to build model
+# context (see utils/context.py): the current source article and a rolling
+# summary of older turns.
+# =============================================================================
+
+import uuid
+
+import config
+from utils.drafts import get_draft_store
+
+
+class Transcript:
+    def __init__(self, window: int = None, store=None):
+        self.window = window or config.TRANSCRIPT_WINDOW
+        self.session_id = uuid.uuid4().hex
+        self.messages = []  # The in-memory window, oldest first
+        self.spilled = 0  # Messages moved to the store; also the seq of messages[0]
+        self.source = None  # Source article text the conversation is about
+        self.summary = ""  # Rolling summary of turns before summarized_upto
+        self.summarized_upto = 0
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_draft_store()
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.messages)
+
+    def append(self, role: str, content: str, **fields) -> dict:
+        """
+        Adds a message and returns it. Anything beyond the window is queued
+        for the store (a background write).
+        """
+        message = {"role": role, "content": content, **fields, "seq": len(self)}
+        self.messages.append(message)
+        overflow = len(self.messages) - self.window
+        if overflow > 0:
+            self.store.add_transcript(self.session_id, self.messages[:overflow])
+            del self.messages[:overflow]
+            self.spilled += overflow
+        return message
+
+    def last(self):
+        return self.messages[-1] if self.messages else None
+
+    def earlier(self, limit: int) -> list:
+        """
+        Loads up to `limit` spilled messages immediately before the window.
+        """
+        if not self.spilled or limit <= 0:
+            return []
+        return self.store.transcript(self.session_id, self.spilled, limit)
+
+    def between(self, start: int, end: int) -> list:
+        """
+        Returns messages with start <= seq < end, from the store and the window.
+        """
+        stored = []
+        if start < min(end, self.spilled):
+            stored = self.store.transcript(self.session_id, min(end, self.spilled), min(end, self.spilled) - start)
+        return stored + [message for message in self.messages if start <= message["seq"] < end]
+
+    def clear(self):
+        """
+        Starts a new, empty transcript and drops the spilled messages.
+        """
+        if self.spilled:
+            self.store.delete_transcript(self.session_id)
+        self.session_id = uuid.uuid4().hex
+        self.messages = []
+        self.spilled = 0
+        self.source = None
+        self.summary = ""
+        self.summarized_upto = 0
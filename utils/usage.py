@@ -0,0 +1,34 @@
+# =============================================================================
+# Token Usage
+# Helpers for reading and summing Anthropic usage blocks, including prompt
+# cache reads and writes, so the app and generator can log them.
+# =============================================================================
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def usage_dict(usage) -> dict:
+    """
+    Converts an API usage object into a plain dict with zeros for missing fields.
+    """
+    return {name: getattr(usage, name, None) or 0 for name in USAGE_FIELDS}
+
+
+def add_usage(total: dict, usage: dict) -> dict:
+    for name in USAGE_FIELDS:
+        total[name] = total.get(name, 0) + usage.get(name, 0)
+    return total
+
+
+def format_usage(usage: dict) -> str:
+    """
+    One-line summary: cache reads vs. writes vs. uncached input, and output.
+    """
+    return (
+        f"cache read {usage.get('cache_read_input_tokens', 0):,} · "
+        f"cache write {usage.get('cache_creation_input_tokens', 0):,} · "
+        f"uncached input {usage.get('input_tokens', 0):,} · "
+        f"output {usage.get('output_tokens', 0):,} tokens"
+    )